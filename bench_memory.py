@@ -0,0 +1,81 @@
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+
+from python import Ingredient, Recipe
+
+INGREDIENT_NAMES = [
+    "Яйца", "Молоко", "Мука", "Сахар", "Соль", "Масло растительное", "Масло сливочное",
+    "Помидоры", "Огурцы", "Лук", "Чеснок", "Морковь", "Картофель", "Рис", "Гречка",
+    "Куриная грудка", "Говядина", "Свинина", "Бекон", "Сыр Пармезан", "Сметана",
+    "Спагетти", "Грибы", "Перец болгарский", "Зелень", "Лимон", "Мёд", "Сливки",
+]
+UNITS = ["г", "мл", "шт", "ст.л", "ч.л", "зубчика"]
+CATEGORIES = ["Завтрак", "Обед", "Ужин", "Десерт", "Закуска"]
+
+class LegacyIngredient:
+    def __init__(self, name, amount, unit):
+        self.name = name
+        self.amount = amount
+        self.unit = unit
+
+class LegacyRecipe:
+    def __init__(self, recipe_id, title, category, time, ingredients, steps, image=None,
+                 servings=None):
+        self.id = recipe_id
+        self.title = title
+        self.category = category
+        self.time = time
+        self.ingredients = ingredients
+        self.steps = steps
+        self.image = image
+        self.servings = servings
+
+def fresh(text):
+    # Строки из SQLite приходят новыми объектами на каждую строку результата
+    return text.encode().decode()
+
+def catalogue_rows(count, ingredients_per_recipe, steps_per_recipe, seed):
+    rng = random.Random(seed)
+    for recipe_id in range(1, count + 1):
+        yield (recipe_id, f"Рецепт {recipe_id}", rng.choice(CATEGORIES), rng.randint(5, 120),
+               [(rng.choice(INGREDIENT_NAMES), rng.randint(1, 500), rng.choice(UNITS))
+                for _ in range(ingredients_per_recipe)],
+               [f"{position}. Шаг приготовления" for position in range(1, steps_per_recipe + 1)])
+
+def measure(recipe_cls, ingredient_cls, args):
+    rows = list(catalogue_rows(args.recipes, args.ingredients, args.steps, args.seed))
+    gc.collect()
+    tracemalloc.start()
+    catalogue = [
+        recipe_cls(recipe_id, title, fresh(category), time,
+                   [ingredient_cls(fresh(name), amount, fresh(unit)) for name, amount, unit in ingredients],
+                   list(steps), servings=2)
+        for recipe_id, title, category, time, ingredients, steps in rows]
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalogue
+    return used / args.recipes
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory benchmark: bytes per recipe for dict-backed vs slotted models.")
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--ingredients", type=int, default=7, help="ingredients per recipe")
+    parser.add_argument("--steps", type=int, default=5, help="steps per recipe")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    before = measure(LegacyRecipe, LegacyIngredient, args)
+    after = measure(Recipe, Ingredient, args)
+    print(f"{args.recipes} recipes, {args.ingredients} ingredients and {args.steps} steps each")
+    print(f"before (__dict__, own strings): {before:8.0f} bytes per recipe")
+    print(f"after  (__slots__, interned):   {after:8.0f} bytes per recipe")
+    print(f"saved: {100 * (1 - after / before):.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
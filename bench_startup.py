@@ -0,0 +1,54 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python.py")
+TIMING_RE = re.compile(r"^(.+): ([0-9.]+) ms$")
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, APP_PATH, "--profile-startup"],
+        env=env, capture_output=True, text=True, check=True, timeout=60).stdout
+    timings = {}
+    for line in output.splitlines():
+        match = TIMING_RE.match(line.strip())
+        if match:
+            timings[match.group(1)] = float(match.group(2))
+    if "first paint" not in timings:
+        raise RuntimeError(f"no startup report in output:\n{output}")
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cold-start benchmark: fails if time to first paint exceeds the budget.")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("STARTUP_BUDGET_MS", 1500)))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--db", help="recipe database to start with (default: the app's own)")
+    parser.add_argument("--offscreen", action="store_true",
+                        help="use Qt's offscreen platform (for machines without a display)")
+    args = parser.parse_args()
+    
+    env = dict(os.environ)
+    if args.db:
+        env["RECIPES_DB"] = args.db
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    
+    runs = [run_once(env) for _ in range(args.runs)]
+    for label in runs[0]:
+        values = sorted(run[label] for run in runs if label in run)
+        print(f"{label:<16} median {statistics.median(values):8.1f} ms   max {values[-1]:8.1f} ms")
+    
+    worst = max(run["first paint"] for run in runs)
+    if worst > args.budget_ms:
+        print(f"FAIL: first paint took {worst:.1f} ms, budget is {args.budget_ms:.0f} ms")
+        return 1
+    print(f"OK: first paint within {args.budget_ms:.0f} ms budget (worst {worst:.1f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,38 @@
-﻿import sys
+﻿import itertools
+import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QStackedWidget, QWidget, 
                             QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                             QListWidget, QLineEdit, QComboBox, QSpinBox, 
                             QTextEdit, QCalendarWidget, QMessageBox, 
-                            QScrollArea, QTabWidget)
-from PyQt5.QtCore import Qt, QDate
+                            QScrollArea, QTabWidget, QListView, QCheckBox)
+from PyQt5.QtCore import (Qt, QDate, QObject, QRunnable, QThreadPool, QTimer,
+                          pyqtSignal)
+
+from python import (DEFAULT_SERVINGS, MenuStore, PopularityCounter, RecipeListModel,
+                    SearchIndex, build_shopping_list, format_quantity, scale_amounts)
 
 # ==================== МОДЕЛИ ДАННЫХ ====================
 class Ingredient:
+    __slots__ = ("name", "amount", "unit")
+    
     def __init__(self, name, amount, unit):
-        self.name = name
+        self.name = sys.intern(name)
         self.amount = amount
-        self.unit = unit
+        self.unit = sys.intern(unit)
 
 class Recipe:
-    def __init__(self, recipe_id, title, category, time, ingredients, steps, image=None):
+    __slots__ = ("id", "title", "category", "time", "ingredients", "steps", "image", "servings")
+    
+    def __init__(self, recipe_id, title, category, time, ingredients, steps, image=None,
+                 servings=DEFAULT_SERVINGS):
         self.id = recipe_id
         self.title = title
-        self.category = category
+        self.category = sys.intern(category)
         self.time = time
         self.ingredients = ingredients
-        self.steps = steps
+        self.steps = tuple(steps) if steps is not None else None
         self.image = image
+        self.servings = servings
 
 class DataRepository:
     _instance = None
@@ -33,7 +44,10 @@ class DataRepository:
         return cls._instance
     
     def __init__(self):
-        self.recipes = [
+        self._recipes_by_id = {}
+        self._recipes_by_category = {}
+        self._search_index = SearchIndex()
+        recipes = [
             Recipe(1, "Спагетти Карбонара", "Основное", 30,
                   [Ingredient("Спагетти", 200, "г"),
                    Ingredient("Бекон", 100, "г")],
@@ -43,30 +57,170 @@ class DataRepository:
                    Ingredient("Помидоры", 1, "шт")],
                   ["1. Взбить яйца", "2. Обжарить с овощами"])
         ]
-        self.menu = []
+        for recipe in recipes:
+            self._index_recipe(recipe)
+        self._next_recipe_id = max(self._recipes_by_id, default=0) + 1
+        self.menu = MenuStore()
+        self.popularity = PopularityCounter()
+    
+    def _index_recipe(self, recipe):
+        self._recipes_by_id[recipe.id] = recipe
+        self._recipes_by_category.setdefault(recipe.category, {})[recipe.id] = recipe
+        self._search_index.add(
+            recipe.id, recipe.title, [ing.name for ing in recipe.ingredients])
+    
+    def _unindex_recipe(self, recipe):
+        self._search_index.remove(recipe.id)
+        self._recipes_by_id.pop(recipe.id, None)
+        category = self._recipes_by_category.get(recipe.category)
+        if category is not None:
+            category.pop(recipe.id, None)
+            if not category:
+                del self._recipes_by_category[recipe.category]
     
     def get_all_recipes(self):
-        return self.recipes
+        return list(self._recipes_by_id.values())
+    
+    def get_recipes_by_category(self, category):
+        return list(self._recipes_by_category.get(category, {}).values())
     
     def get_recipe_by_id(self, recipe_id):
-        for recipe in self.recipes:
-            if recipe.id == recipe_id:
-                return recipe
-        return None
+        return self._recipes_by_id.get(recipe_id)
+    
+    def _allocate_recipe_id(self):
+        recipe_id = self._next_recipe_id
+        self._next_recipe_id += 1
+        return recipe_id
     
     def add_recipe(self, recipe):
-        recipe.id = max(r.id for r in self.recipes) + 1 if self.recipes else 1
-        self.recipes.append(recipe)
+        recipe.id = self._allocate_recipe_id()
+        self._index_recipe(recipe)
         return recipe.id
     
-    def get_weekly_menu(self):
-        return self.menu
+    def add_recipes(self, recipes):
+        recipe_ids = []
+        for recipe in recipes:
+            recipe.id = self._allocate_recipe_id()
+            self._index_recipe(recipe)
+            recipe_ids.append(recipe.id)
+        return recipe_ids
+    
+    def update_recipe(self, recipe):
+        old = self._recipes_by_id.get(recipe.id)
+        if old is None:
+            return False
+        if old.category != recipe.category:
+            self._unindex_recipe(old)
+        else:
+            self._search_index.remove(old.id)
+        self._index_recipe(recipe)
+        self.menu.replace_recipe(recipe)
+        return True
+    
+    def delete_recipe(self, recipe_id):
+        recipe = self._recipes_by_id.get(recipe_id)
+        if recipe is None:
+            return False
+        self._unindex_recipe(recipe)
+        self.menu.remove_recipe(recipe_id)
+        self.popularity.remove(recipe_id)
+        return True
+    
+    def iter_recipes(self, recipe_ids=None):
+        if recipe_ids is None:
+            return iter(list(self._recipes_by_id.values()))
+        return (self._recipes_by_id[recipe_id] for recipe_id in recipe_ids
+                if recipe_id in self._recipes_by_id)
+    
+    def search_recipe_ids(self, query, limit=None):
+        return self._search_index.search(query, limit)
+    
+    def get_menu_for_date(self, date):
+        return self.menu.get_day(date)
+    
+    def get_weekly_menu(self, date):
+        return list(self.menu.week(date))
+    
+    def get_menu_range(self, start_date, end_date):
+        return list(self.menu.slots(start_date, end_date))
     
     def add_to_menu(self, date, meal_type, recipe):
-        self.menu.append((date, meal_type, recipe))
+        self.menu.set(date, meal_type, recipe)
+        if recipe is not None:
+            self.popularity.record(recipe.id, PopularityCounter.COOK_WEIGHT)
+    
+    def record_recipe_view(self, recipe_id):
+        self.popularity.record(recipe_id, PopularityCounter.VIEW_WEIGHT)
+    
+    def get_popular_recipes(self, limit):
+        recipes = [self._recipes_by_id[recipe_id] for recipe_id in self.popularity.top(limit)]
+        if len(recipes) < limit:
+            popular = {recipe.id for recipe in recipes}
+            recipes.extend(itertools.islice(
+                (recipe for recipe in self._recipes_by_id.values() if recipe.id not in popular),
+                limit - len(recipes)))
+        return recipes
+    
+    def scale_recipes(self, recipe_ids, servings):
+        recipes = [self._recipes_by_id[recipe_id] for recipe_id in dict.fromkeys(recipe_ids)
+                   if recipe_id in self._recipes_by_id]
+        ingredients = [ing for recipe in recipes for ing in recipe.ingredients]
+        amounts = scale_amounts(
+            [ing.amount for ing in ingredients],
+            [servings / recipe.servings for recipe in recipes for _ in recipe.ingredients])
+        scaled = {recipe.id: [] for recipe in recipes}
+        owners = (recipe.id for recipe in recipes for _ in recipe.ingredients)
+        for recipe_id, ing, amount in zip(owners, ingredients, amounts):
+            scaled[recipe_id].append(Ingredient(ing.name, amount, ing.unit))
+        return scaled
+    
+    def scale_menu(self, start_date, end_date, servings):
+        slots = [(date, meal_type, recipe.id)
+                 for date, meal_type, recipe in self.menu.slots(start_date, end_date)]
+        scaled = self.scale_recipes([recipe_id for _, _, recipe_id in slots], servings)
+        return {(date, meal_type): scaled.get(recipe_id, [])
+                for date, meal_type, recipe_id in slots}
+    
+    def get_shopping_list(self, start_date, end_date, servings=None):
+        recipes = [recipe for _, _, recipe in self.menu.slots(start_date, end_date)]
+        ingredients = [ing for recipe in recipes for ing in recipe.ingredients]
+        amounts = scale_amounts(
+            [ing.amount for ing in ingredients],
+            [servings / recipe.servings if servings else 1
+             for recipe in recipes for _ in recipe.ingredients])
+        return build_shopping_list(
+            (ing.name, amount, ing.unit, 1) for ing, amount in zip(ingredients, amounts))
+
+# ==================== ФОНОВЫЙ ПОИСК ====================
+class SearchSignals(QObject):
+    results_ready = pyqtSignal(int, list, bool)
+
+class SearchTask(QRunnable):
+    FIRST_PAGE_SIZE = 50
+    
+    def __init__(self, generation, query, is_current):
+        super().__init__()
+        self.generation = generation
+        self.query = query
+        self.is_current = is_current
+        self.signals = SearchSignals()
+    
+    def run(self):
+        repo = DataRepository.instance()
+        first_page = repo.search_recipe_ids(self.query, self.FIRST_PAGE_SIZE)
+        if not self.is_current(self.generation):
+            return
+        self.signals.results_ready.emit(self.generation, first_page, True)
+        if len(first_page) < self.FIRST_PAGE_SIZE:
+            return
+        rest = repo.search_recipe_ids(self.query)[self.FIRST_PAGE_SIZE:]
+        if rest and self.is_current(self.generation):
+            self.signals.results_ready.emit(self.generation, rest, False)
 
 # ==================== ЭКРАНЫ ПРИЛОЖЕНИЯ ====================
 class HomeView(QWidget):
+    POPULAR_COUNT = 3
+    
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
@@ -101,22 +255,40 @@ class HomeView(QWidget):
         popular_title.setStyleSheet("font-size: 18px; font-weight: bold; margin: 10px;")
         popular_layout.addWidget(popular_title)
         
-        repo = DataRepository.instance()
-        for recipe in repo.get_all_recipes()[:3]:
-            btn = QPushButton(f"{recipe.title} ({recipe.time} мин)")
-            btn.clicked.connect(lambda _, r=recipe: self.parent.show_recipe_detail(r.id))
-            popular_layout.addWidget(btn)
+        self.popular_buttons = QVBoxLayout()
+        popular_layout.addLayout(self.popular_buttons)
+        popular_layout.addStretch()
+        self.load_popular()
         
         popular_widget.setLayout(popular_layout)
         scroll.setWidget(popular_widget)
         layout.addWidget(scroll)
         
         self.setLayout(layout)
+    
+    def load_popular(self):
+        while self.popular_buttons.count():
+            child = self.popular_buttons.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+        
+        repo = DataRepository.instance()
+        for recipe in repo.get_popular_recipes(self.POPULAR_COUNT):
+            btn = QPushButton(f"{recipe.title} ({recipe.time} мин)")
+            btn.clicked.connect(lambda _, r=recipe: self.parent.show_recipe_detail(r.id))
+            self.popular_buttons.addWidget(btn)
 
 class RecipesView(QWidget):
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self._search_generation = 0
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self._search_timer.timeout.connect(self.search_recipes)
         self.init_ui()
     
     def init_ui(self):
@@ -126,10 +298,12 @@ class RecipesView(QWidget):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск рецептов...")
+        self.search_input.textChanged.connect(self._search_timer.start)
         search_layout.addWidget(self.search_input)
         
         self.category_filter = QComboBox()
         self.category_filter.addItems(["Все категории", "Завтраки", "Основные", "Десерты"])
+        self.category_filter.currentIndexChanged.connect(self._search_timer.start)
         search_layout.addWidget(self.category_filter)
         
         search_btn = QPushButton("Найти")
@@ -138,10 +312,13 @@ class RecipesView(QWidget):
         
         layout.addLayout(search_layout)
         
-        self.recipes_list = QListWidget()
-        self.recipes_list.itemDoubleClicked.connect(
-            lambda: self.parent.show_recipe_detail(
-                self.recipes_list.currentRow() + 1))
+        self.recipes_model = RecipeListModel(
+            label=lambda r: f"{r.title} ({r.time} мин)", parent=self)
+        self.recipes_list = QListView()
+        self.recipes_list.setUniformItemSizes(True)
+        self.recipes_list.setModel(self.recipes_model)
+        self.recipes_list.doubleClicked.connect(
+            lambda index: self.parent.show_recipe_detail(index.data(Qt.UserRole)))
         layout.addWidget(self.recipes_list)
         
         action_layout = QHBoxLayout()
@@ -159,23 +336,41 @@ class RecipesView(QWidget):
         self.setLayout(layout)
     
     def load_recipes(self):
-        self.recipes_list.clear()
         repo = DataRepository.instance()
-        for recipe in repo.get_all_recipes():
-            self.recipes_list.addItem(f"{recipe.title} ({recipe.time} мин)")
+        self.recipes_model.set_source(repo.iter_recipes())
     
     def search_recipes(self):
-        search_text = self.search_input.text().lower()
-        category = self.category_filter.currentText()
+        self._search_timer.stop()
+        self._search_generation += 1
+        search_text = self.search_input.text().strip()
         
-        self.recipes_list.clear()
-        repo = DataRepository.instance()
+        if not search_text:
+            self.show_search_results(self._search_generation, None, True)
+            return
+        
+        task = SearchTask(self._search_generation, search_text, self._is_current_search)
+        task.signals.results_ready.connect(self.show_search_results)
+        QThreadPool.globalInstance().start(task)
+    
+    def _is_current_search(self, generation):
+        return generation == self._search_generation
+    
+    def show_search_results(self, generation, recipe_ids, first_page):
+        if generation != self._search_generation:
+            return
         
-        for recipe in repo.get_all_recipes():
-            if (search_text in recipe.title.lower() or 
-                any(search_text in ing.name.lower() for ing in recipe.ingredients)):
-                if category == "Все категории" or recipe.category == category:
-                    self.recipes_list.addItem(f"{recipe.title} ({recipe.time} мин)")
+        category = self.category_filter.currentText()
+        repo = DataRepository.instance()
+        recipes = repo.iter_recipes(recipe_ids)
+        if category != "Все категории":
+            recipes = (recipe for recipe in recipes if recipe.category == category)
+        
+        if first_page:
+            self.recipes_model.set_source(recipes)
+        else:
+            self.recipes_model.extend_source(recipes)
+            if self.recipes_model.canFetchMore():
+                self.recipes_model.fetchMore()
 
 class RecipeDetailView(QWidget):
     def __init__(self, parent):
@@ -265,6 +460,9 @@ class AddRecipeView(QWidget):
         self.time_input.setRange(1, 600)
         self.time_input.setSuffix(" мин")
         
+        self.servings_input = QSpinBox()
+        self.servings_input.setRange(1, 100)
+        
         ingredients_label = QLabel("Ингредиенты:")
         self.ingredients_edit = QTextEdit()
         self.ingredients_edit.setPlaceholderText("Каждый ингредиент с новой строки в формате: Название, количество, единица\nНапример: Мука, 200, г")
@@ -290,6 +488,8 @@ class AddRecipeView(QWidget):
         layout.addWidget(self.category_input)
         layout.addWidget(QLabel("Время приготовления:"))
         layout.addWidget(self.time_input)
+        layout.addWidget(QLabel("Количество порций:"))
+        layout.addWidget(self.servings_input)
         layout.addWidget(ingredients_label)
         layout.addWidget(self.ingredients_edit)
         layout.addWidget(steps_label)
@@ -302,6 +502,7 @@ class AddRecipeView(QWidget):
         self.name_input.clear()
         self.category_input.setCurrentIndex(0)
         self.time_input.setValue(10)
+        self.servings_input.setValue(DEFAULT_SERVINGS)
         self.ingredients_edit.clear()
         self.steps_edit.clear()
     
@@ -340,7 +541,8 @@ class AddRecipeView(QWidget):
             category=self.category_input.currentText(),
             time=self.time_input.value(),
             ingredients=ingredients,
-            steps=steps
+            steps=steps,
+            servings=self.servings_input.value()
         )
         
         repo = DataRepository.instance()
@@ -400,8 +602,8 @@ class MenuView(QWidget):
         repo = DataRepository.instance()
         self.menu_list.clear()
         
-        for date, meal_type, recipe in repo.get_weekly_menu():
-            if date == selected_date.toString("yyyy-MM-dd"):
+        for meal_type, recipe in repo.get_menu_for_date(selected_date).items():
+            if recipe is not None:
                 self.menu_list.addItem(f"{meal_type}: {recipe.title}")
     
     def add_to_menu(self):
@@ -409,7 +611,18 @@ class MenuView(QWidget):
         self.parent.show_info_message("Функция добавления в меню будет реализована в следующей версии")
     
     def generate_shopping_list(self):
-        self.parent.show_info_message("Список покупок сгенерирован и сохранён")
+        selected = self.calendar.selectedDate()
+        week_start = selected.addDays(1 - selected.dayOfWeek())
+        week_end = week_start.addDays(6)
+        repo = DataRepository.instance()
+        items = repo.get_shopping_list(week_start, week_end)
+        
+        period = f"{week_start.toString('dd.MM')}–{week_end.toString('dd.MM.yyyy')}"
+        if not items:
+            self.parent.show_info_message(f"На {period} блюда не запланированы")
+            return
+        lines = [f"- {item.name}: {format_quantity(item.amount, item.unit)}" for item in items]
+        self.parent.show_info_message(f"Список покупок на {period}:\n" + "\n".join(lines))
 
 class ProfileView(QWidget):
     def __init__(self, parent):
@@ -487,44 +700,59 @@ class MainWindow(QMainWindow):
         
         self.stack = QStackedWidget()
         
-        self.home_view = HomeView(self)
-        self.recipes_view = RecipesView(self)
-        self.menu_view = MenuView(self)
-        self.profile_view = ProfileView(self)
-        self.recipe_detail_view = RecipeDetailView(self)
-        self.add_recipe_view = AddRecipeView(self)
-        
-        self.stack.addWidget(self.home_view)
-        self.stack.addWidget(self.recipes_view)
-        self.stack.addWidget(self.menu_view)
-        self.stack.addWidget(self.profile_view)
-        self.stack.addWidget(self.recipe_detail_view)
-        self.stack.addWidget(self.add_recipe_view)
+        self.views = {}
+        self.view_classes = {
+            'home': HomeView,
+            'recipes': RecipesView,
+            'menu': MenuView,
+            'profile': ProfileView,
+            'recipe_detail': RecipeDetailView,
+            'add_recipe': AddRecipeView
+        }
         
         self.setCentralWidget(self.stack)
         self.show_home()
     
+    def get_view(self, name):
+        view = self.views.get(name)
+        if view is None:
+            view = self.view_classes[name](self)
+            self.views[name] = view
+            self.stack.addWidget(view)
+        return view
+    
     def show_home(self):
-        self.stack.setCurrentWidget(self.home_view)
+        if 'home' in self.views:
+            self.views['home'].load_popular()
+        self.stack.setCurrentWidget(self.get_view('home'))
     
     def show_recipes(self):
-        self.recipes_view.load_recipes()
-        self.stack.setCurrentWidget(self.recipes_view)
+        view = self.get_view('recipes')
+        view.load_recipes()
+        self.stack.setCurrentWidget(view)
     
     def show_menu(self):
-        self.menu_view.load_weekly_menu()
-        self.stack.setCurrentWidget(self.menu_view)
+        view = self.get_view('menu')
+        view.load_weekly_menu()
+        self.stack.setCurrentWidget(view)
     
     def show_profile(self):
-        self.stack.setCurrentWidget(self.profile_view)
+        self.stack.setCurrentWidget(self.get_view('profile'))
     
     def show_recipe_detail(self, recipe_id):
-        self.recipe_detail_view.load_recipe(recipe_id)
-        self.stack.setCurrentWidget(self.recipe_detail_view)
+        repo = DataRepository.instance()
+        if repo.get_recipe_by_id(recipe_id) is None:
+            self.show_error_message("Рецепт не найден")
+            return
+        repo.record_recipe_view(recipe_id)
+        view = self.get_view('recipe_detail')
+        view.load_recipe(recipe_id)
+        self.stack.setCurrentWidget(view)
     
     def show_add_recipe(self):
-        self.add_recipe_view.clear_form()
-        self.stack.setCurrentWidget(self.add_recipe_view)
+        view = self.get_view('add_recipe')
+        view.clear_form()
+        self.stack.setCurrentWidget(view)
     
     def show_error_message(self, message):
         QMessageBox.critical(self, "Ошибка", message)
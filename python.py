@@ -1,29 +1,1378 @@
-﻿import sys
+﻿import time
+
+_STARTED_AT = time.perf_counter()
+
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import functools
+import heapq
+import itertools
+import math
+import mmap
+import operator
+import os
+import random
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import weakref
+import zlib
+from array import array
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QListWidget, 
                             QLineEdit, QComboBox, QSpinBox, QTextEdit, 
                             QCalendarWidget, QMessageBox, QScrollArea, 
                             QTabWidget, QCheckBox, QGroupBox, QFrame,
                             QStackedWidget, QDialog, QDialogButtonBox, 
-                            QListWidgetItem)
-from PyQt5.QtCore import Qt, QDate
-from PyQt5.QtGui import QIcon, QFont, QColor, QPalette
+                            QListWidgetItem, QListView, QAbstractScrollArea)
+from PyQt5.QtCore import (Qt, QDate, QAbstractListModel, QModelIndex, QObject,
+                          QEvent, QRunnable, QThreadPool, QTimer, pyqtSignal)
+from PyQt5.QtGui import QIcon, QFont, QColor, QPalette, QTextCharFormat
+
+_IMPORTED_AT = time.perf_counter()
+
+DB_PATH = os.environ.get(
+    "RECIPES_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.db"))
 
 class Ingredient:
+    __slots__ = ("name", "amount", "unit")
+    
     def __init__(self, name, amount, unit):
-        self.name = name
+        self.name = sys.intern(name)
         self.amount = amount
-        self.unit = unit
+        self.unit = sys.intern(unit)
+
+DEFAULT_SERVINGS = 2
 
 class Recipe:
-    def __init__(self, recipe_id, title, category, time, ingredients, steps, image=None):
+    __slots__ = ("id", "title", "category", "time", "ingredients", "steps", "image", "servings")
+    
+    def __init__(self, recipe_id, title, category, time, ingredients, steps, image=None,
+                 servings=None):
         self.id = recipe_id
         self.title = title
-        self.category = category
+        self.category = sys.intern(category)
         self.time = time
         self.ingredients = ingredients
-        self.steps = steps
+        self.steps = tuple(steps) if steps is not None else None
         self.image = image
+        self.servings = servings
+
+class Unit:
+    __slots__ = ("name", "dimension", "factor")
+    
+    def __init__(self, name, dimension, factor):
+        self.name = name
+        self.dimension = dimension
+        self.factor = factor
+    
+    def __repr__(self):
+        return f"Unit({self.name!r})"
+
+class UnitRegistry:
+    MASS = "mass"
+    VOLUME = "volume"
+    
+    def __init__(self):
+        self._aliases = {}
+        self._base_units = {}
+        self._display_units = {}
+        self._lookup_cache = {}
+        self._factor_cache = {}
+    
+    @staticmethod
+    def _normalize(text):
+        return text.strip().lower().replace("ё", "е").replace(" ", "").rstrip(".")
+    
+    def register(self, name, dimension, factor, aliases=(), base=False, display=False):
+        unit = Unit(name, dimension, factor)
+        for alias in (name, *aliases):
+            self._aliases[self._normalize(alias)] = unit
+        if base:
+            self._base_units[dimension] = unit
+        if display:
+            self._display_units.setdefault(dimension, []).append(unit)
+            self._display_units[dimension].sort(key=lambda u: u.factor, reverse=True)
+        self._lookup_cache.clear()
+        return unit
+    
+    def get(self, text):
+        unit = self._lookup_cache.get(text)
+        if unit is None:
+            key = self._normalize(text)
+            unit = self._aliases.get(key)
+            if unit is None:
+                # Незнакомая единица становится базовой сама для себя; кэш при этом не сбрасываем
+                unit = self._aliases[key] = Unit(text.strip(), f"other:{key}", 1)
+                self._base_units[unit.dimension] = unit
+            self._lookup_cache[text] = unit
+        return unit
+    
+    def base_unit(self, unit):
+        return self._base_units[unit.dimension]
+    
+    def factor(self, from_unit, to_unit, density=None):
+        key = (from_unit, to_unit, density)
+        factor = self._factor_cache.get(key)
+        if factor is None:
+            factor = from_unit.factor / to_unit.factor
+            if from_unit.dimension != to_unit.dimension:
+                dimensions = (from_unit.dimension, to_unit.dimension)
+                if density is None or set(dimensions) != {self.MASS, self.VOLUME}:
+                    raise ValueError(f"cannot convert {from_unit.name} to {to_unit.name}")
+                factor *= density if from_unit.dimension == self.VOLUME else 1 / density
+            self._factor_cache[key] = factor
+        return factor
+    
+    def convert(self, amount, from_unit, to_unit, ingredient=None):
+        from_unit = self.get(from_unit) if isinstance(from_unit, str) else from_unit
+        to_unit = self.get(to_unit) if isinstance(to_unit, str) else to_unit
+        density = INGREDIENT_DENSITIES.get(ingredient.lower()) if ingredient else None
+        return amount * self.factor(from_unit, to_unit, density)
+    
+    def humanize(self, amount, unit):
+        unit = self.get(unit) if isinstance(unit, str) else unit
+        base_amount = amount * unit.factor
+        for display_unit in self._display_units.get(unit.dimension, ()):
+            if base_amount >= display_unit.factor:
+                return base_amount / display_unit.factor, display_unit
+        return amount, unit
+
+INGREDIENT_DENSITIES = {
+    "вода": 1.0,
+    "молоко": 1.03,
+    "сливки": 1.0,
+    "масло растительное": 0.92,
+    "масло оливковое": 0.91,
+    "мука": 0.53,
+    "сахар": 0.85,
+    "соль": 1.2,
+    "мед": 1.42,
+    "рис": 0.85,
+    "соус цезарь": 1.0,
+}
+
+UNITS = UnitRegistry()
+UNITS.register("г", UnitRegistry.MASS, 1, ("гр", "грамм", "грамма", "граммов"),
+               base=True, display=True)
+UNITS.register("кг", UnitRegistry.MASS, 1000, ("килограмм", "килограмма"), display=True)
+UNITS.register("мг", UnitRegistry.MASS, 0.001)
+UNITS.register("мл", UnitRegistry.VOLUME, 1, ("миллилитр",), base=True, display=True)
+UNITS.register("л", UnitRegistry.VOLUME, 1000, ("литр", "литра"), display=True)
+UNITS.register("ст.л", UnitRegistry.VOLUME, 15, ("ст. л", "столовая ложка", "ст.ложка"))
+UNITS.register("ч.л", UnitRegistry.VOLUME, 5, ("ч. л", "чайная ложка", "ч.ложка"))
+UNITS.register("стакан", UnitRegistry.VOLUME, 250, ("стакана", "стаканов"))
+UNITS.register("шт", "count", 1, ("штука", "штуки", "штук"), base=True)
+UNITS.register("зубчик", "clove", 1, ("зубчика", "зубчиков"), base=True)
+
+def scale_amounts(amounts, factors):
+    return array("d", map(operator.mul, amounts, factors))
+
+def format_amount(amount):
+    return f"{round(amount, 2):g}"
+
+def format_quantity(amount, unit):
+    amount, unit = UNITS.humanize(amount, unit)
+    return f"{format_amount(amount)} {unit.name}"
+
+def build_shopping_list(ingredients):
+    grams = UNITS.get("г")
+    totals = {}
+    for name, amount, unit, times in ingredients:
+        unit = UNITS.get(unit)
+        key = (name, UNITS.base_unit(unit))
+        totals[key] = totals.get(key, 0) + amount * unit.factor * times
+    
+    # Объём складывается с массой того же продукта, если известна его плотность
+    for (name, base_unit), amount in list(totals.items()):
+        density = INGREDIENT_DENSITIES.get(name.lower())
+        if base_unit.dimension == UnitRegistry.VOLUME and density and (name, grams) in totals:
+            totals[(name, grams)] += amount * UNITS.factor(base_unit, grams, density)
+            del totals[(name, base_unit)]
+    
+    return [Ingredient(name, amount, base_unit.name)
+            for (name, base_unit), amount in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1].name))]
+
+_TOKEN_RE = re.compile(r"\w+")
+_RUSSIAN_ENDINGS = sorted([
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ых", "их", "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее",
+    "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев",
+    "ы", "и", "а", "я", "о", "е", "у", "ю", "ь",
+], key=len, reverse=True)
+
+def normalize_token(token):
+    token = token.lower().replace("ё", "е")
+    for ending in _RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+def tokenize(text):
+    return [normalize_token(token) for token in _TOKEN_RE.findall(text)]
+
+class SearchIndex:
+    TITLE_WEIGHT = 3
+    INGREDIENT_WEIGHT = 1
+    # Префикс короче трёх букв разворачивается в тысячи слов: такие слова ищем только целиком,
+    # а длинный префикс — не больше чем по MAX_PREFIX_TERMS ближайшим словам
+    MIN_PREFIX_LENGTH = 3
+    MAX_PREFIX_TERMS = 64
+    
+    def __init__(self):
+        # Слово -> (рецепты со словом в названии, рецепты со словом только в ингредиентах):
+        # отсортированные array("I"), поэтому первые по рейтингу берутся без полного подсчёта
+        self._postings = {}
+        self._doc_terms = {}
+        self._sorted_terms = None
+        self._lock = threading.Lock()
+    
+    def add(self, recipe_id, title, ingredient_names):
+        with self._lock:
+            self._remove(recipe_id)
+            title_terms = tuple(dict.fromkeys(tokenize(title)))
+            ingredient_terms = tuple(dict.fromkeys(
+                term for name in ingredient_names for term in tokenize(name)
+                if term not in title_terms))
+            for tier, terms in enumerate((title_terms, ingredient_terms)):
+                for term in terms:
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array("I"), array("I"))
+                        self._sorted_terms = None
+                    ids = postings[tier]
+                    if not ids or ids[-1] < recipe_id:
+                        ids.append(recipe_id)
+                    else:
+                        ids.insert(bisect.bisect_left(ids, recipe_id), recipe_id)
+            self._doc_terms[recipe_id] = (title_terms, ingredient_terms)
+    
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+    
+    def _remove(self, recipe_id):
+        for tier, terms in enumerate(self._doc_terms.pop(recipe_id, ())):
+            for term in terms:
+                postings = self._postings[term]
+                ids = postings[tier]
+                del ids[bisect.bisect_left(ids, recipe_id)]
+                if not postings[0] and not postings[1]:
+                    del self._postings[term]
+                    self._sorted_terms = None
+    
+    def _terms_with_prefix(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + "\uffff", start)
+        return terms[start:end]
+    
+    def _tiers(self, query_term):
+        # Уровни оценки по убыванию: слово целиком в названии, префикс в названии,
+        # слово целиком в ингредиентах, префикс в ингредиентах
+        if len(query_term) < self.MIN_PREFIX_LENGTH:
+            prefixed = []
+        else:
+            prefixed = self._terms_with_prefix(query_term)
+            if len(prefixed) > self.MAX_PREFIX_TERMS:
+                prefixed = heapq.nsmallest(self.MAX_PREFIX_TERMS, prefixed, key=len)
+            prefixed = [self._postings[term] for term in prefixed if term != query_term]
+        exact = self._postings.get(query_term)
+        tiers = []
+        for tier, weight in enumerate((self.TITLE_WEIGHT, self.INGREDIENT_WEIGHT)):
+            if exact is not None and exact[tier]:
+                tiers.append((weight * 2, [exact[tier]]))
+            lists = [postings[tier] for postings in prefixed if postings[tier]]
+            if lists:
+                tiers.append((weight, lists))
+        tiers.sort(key=lambda item: -item[0])
+        return tiers
+    
+    @staticmethod
+    def _ranked(tiers):
+        # Рецепты одного слова по убыванию оценки, при равной оценке — по номеру
+        seen = set()
+        for score, lists in tiers:
+            for recipe_id in lists[0] if len(lists) == 1 else heapq.merge(*lists):
+                if recipe_id not in seen:
+                    seen.add(recipe_id)
+                    yield score, recipe_id
+    
+    def _scorer(self, tiers):
+        # Пока проверок мало, ищем бинарным поиском по спискам; когда их число сравнится
+        # с размером списков, один раз сводим слово в словарь
+        list_count = sum(len(lists) for _, lists in tiers)
+        budget = sum(len(ids) for _, lists in tiers for ids in lists)
+        scores = None
+        def lookup(recipe_id):
+            nonlocal budget, scores
+            if scores is None:
+                budget -= list_count
+                if budget >= 0:
+                    for score, lists in tiers:
+                        for ids in lists:
+                            position = bisect.bisect_left(ids, recipe_id)
+                            if position < len(ids) and ids[position] == recipe_id:
+                                return score
+                    return 0
+                scores = {recipe_id: score for score, recipe_id in self._ranked(tiers)}
+            return scores.get(recipe_id, 0)
+        return lookup
+    
+    def search(self, query, limit=None):
+        with self._lock:
+            query_tiers = [self._tiers(term) for term in set(tokenize(query))]
+            if not query_tiers or not all(query_tiers):
+                return []
+            query_tiers.sort(key=lambda tiers: sum(len(ids) for _, lists in tiers
+                                                   for ids in lists))
+            driver, others = query_tiers[0], query_tiers[1:]
+            if not others:
+                return [recipe_id for _, recipe_id in itertools.islice(
+                    self._ranked(driver), limit)]
+            # Рецепты самого редкого слова идут по убыванию его оценки, а при равной — по
+            # номеру; остальные слова добавят не больше своей лучшей оценки, поэтому, когда
+            # даже такой итог не лучше худшего из первых limit, дальше можно не идти
+            bonus = sum(tiers[0][0] for tiers in others)
+            scorers = [self._scorer(tiers) for tiers in others]
+            best = []
+            for score, recipe_id in self._ranked(driver):
+                if limit is not None and len(best) == limit and \
+                        best[0] > (score + bonus, -recipe_id):
+                    break
+                total = score
+                for scorer in scorers:
+                    other = scorer(recipe_id)
+                    if not other:
+                        break
+                    total += other
+                else:
+                    if limit is None:
+                        best.append((-total, recipe_id))
+                    elif len(best) < limit:
+                        heapq.heappush(best, (total, -recipe_id))
+                    elif (total, -recipe_id) > best[0]:
+                        heapq.heapreplace(best, (total, -recipe_id))
+            if limit is None:
+                return [recipe_id for _, recipe_id in sorted(best)]
+            return [-negative_id for _, negative_id in sorted(best, reverse=True)]
+
+@functools.lru_cache(maxsize=65536)
+def ingredient_key(name):
+    return " ".join(tokenize(name))
+
+def _bits_to_ids(bits):
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            ids.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+class IngredientIndex:
+    def __init__(self):
+        self._bitsets = {}
+        self._recipe_keys = {}
+        self._all = 0
+    
+    @classmethod
+    def from_rows(cls, rows):
+        index = cls()
+        recipe_ids = {}
+        for recipe_id, name in rows:
+            key = ingredient_key(name)
+            if key:
+                recipe_ids.setdefault(key, set()).add(recipe_id)
+                index._recipe_keys.setdefault(recipe_id, set()).add(key)
+        size = (max(index._recipe_keys, default=0) >> 3) + 1
+        for key, ids in recipe_ids.items():
+            index._bitsets[key] = cls._pack(ids, size)
+        index._all = cls._pack(index._recipe_keys, size)
+        return index
+    
+    @staticmethod
+    def _pack(recipe_ids, size):
+        data = bytearray(size)
+        for recipe_id in recipe_ids:
+            data[recipe_id >> 3] |= 1 << (recipe_id & 7)
+        return int.from_bytes(data, "little")
+    
+    def add(self, recipe_id, ingredient_names):
+        keys = {ingredient_key(name) for name in ingredient_names} - {""}
+        bit = 1 << recipe_id
+        for key in keys:
+            self._bitsets[key] = self._bitsets.get(key, 0) | bit
+        self._recipe_keys[recipe_id] = keys
+        self._all |= bit
+    
+    def remove(self, recipe_id):
+        mask = ~(1 << recipe_id)
+        for key in self._recipe_keys.pop(recipe_id, ()):
+            bits = self._bitsets[key] & mask
+            if bits:
+                self._bitsets[key] = bits
+            else:
+                del self._bitsets[key]
+        self._all &= mask
+    
+    def missing_at_most(self, ingredient_names, max_missing=0):
+        available = {ingredient_key(name) for name in ingredient_names}
+        # levels[t] — рецепты, которым не хватает хотя бы t + 1 ингредиентов
+        levels = [0] * (max_missing + 1)
+        for key, bits in self._bitsets.items():
+            if key in available:
+                continue
+            for t in range(max_missing, 0, -1):
+                levels[t] |= levels[t - 1] & bits
+            levels[0] |= bits
+        matches = []
+        remaining = self._all
+        for missing, level in enumerate(levels):
+            matches.extend((recipe_id, missing) for recipe_id in _bits_to_ids(remaining & ~level))
+            remaining &= level
+        return matches
+    
+    def covered_by(self, ingredient_names):
+        return [recipe_id for recipe_id, _ in self.missing_at_most(ingredient_names)]
+    
+    def most_similar(self, recipe_id, limit=10):
+        # Точный коэффициент Жаккара по всем рецептам хотя бы с одним общим ингредиентом
+        keys = self._recipe_keys.get(recipe_id)
+        if not keys:
+            return []
+        sharing = 0
+        for key in keys:
+            sharing |= self._bitsets[key]
+        sharing &= ~(1 << recipe_id)
+        scored = []
+        for candidate in _bits_to_ids(sharing):
+            other = self._recipe_keys[candidate]
+            shared = len(keys & other)
+            scored.append((shared / (len(keys) + len(other) - shared), candidate))
+        return [(candidate, score) for score, candidate in heapq.nlargest(
+            limit, scored, key=lambda item: (item[0], -item[1]))]
+
+_MINHASH_PRIME = 1073741789
+
+class SimilarityIndex:
+    NUM_BANDS = 16
+    BAND_ROWS = 2
+    MAX_CANDIDATES = 500
+    MAX_BUCKET_SCAN = 2000
+    
+    def __init__(self, seed=1):
+        rng = random.Random(seed)
+        self._coefficients = [
+            (rng.randrange(1, _MINHASH_PRIME), rng.randrange(_MINHASH_PRIME))
+            for _ in range(self.NUM_BANDS * self.BAND_ROWS)]
+        self._key_hashes = {}
+        self._recipe_keys = {}
+        self._band_keys = {}
+        self._buckets = [{} for _ in range(self.NUM_BANDS)]
+    
+    def _hashes(self, key):
+        hashes = self._key_hashes.get(key)
+        if hashes is None:
+            value = zlib.crc32(key.encode())
+            hashes = self._key_hashes[key] = tuple(
+                (a * value + b) % _MINHASH_PRIME for a, b in self._coefficients)
+        return hashes
+    
+    def add(self, recipe_id, ingredient_names):
+        keys = frozenset(ingredient_key(name) for name in ingredient_names) - {""}
+        if not keys:
+            return
+        signature = tuple(map(min, zip(*map(self._hashes, keys))))
+        rows = self.BAND_ROWS
+        band_keys = [hash(signature[start:start + rows])
+                     for start in range(0, len(signature), rows)]
+        self._recipe_keys[recipe_id] = keys
+        self._band_keys[recipe_id] = band_keys
+        for buckets, band_key in zip(self._buckets, band_keys):
+            bucket = buckets.get(band_key)
+            if bucket is None:
+                buckets[band_key] = [recipe_id]
+            else:
+                bucket.append(recipe_id)
+    
+    def remove(self, recipe_id):
+        self._recipe_keys.pop(recipe_id, None)
+        for buckets, band_key in zip(self._buckets, self._band_keys.pop(recipe_id, ())):
+            bucket = buckets[band_key]
+            bucket.remove(recipe_id)
+            if not bucket:
+                del buckets[band_key]
+    
+    def similar(self, recipe_id, limit=10):
+        keys = self._recipe_keys.get(recipe_id)
+        if keys is None:
+            return []
+        # Огромные корзины — это общие ингредиенты вроде соли: почти ничего не говорят о сходстве
+        bands = sorted((buckets[band_key] for buckets, band_key
+                        in zip(self._buckets, self._band_keys[recipe_id])), key=len)
+        collisions = collections.Counter()
+        for bucket in bands:
+            if len(bucket) > self.MAX_BUCKET_SCAN and len(collisions) > 1:
+                break
+            collisions.update(itertools.islice(bucket, self.MAX_BUCKET_SCAN))
+        del collisions[recipe_id]
+        scored = []
+        for candidate, _ in collisions.most_common(self.MAX_CANDIDATES):
+            other = self._recipe_keys[candidate]
+            shared = len(keys & other)
+            scored.append((shared / (len(keys) + len(other) - shared), candidate))
+        return [(candidate, score) for score, candidate in heapq.nlargest(
+            limit, scored, key=lambda item: (item[0], -item[1]))]
+
+def iter_dated_baskets(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        current_key = None
+        items = []
+        for date, basket_id, item in csv.reader(f):
+            key = (date, basket_id)
+            if key != current_key:
+                if items:
+                    yield current_key[0], items
+                current_key = key
+                items = []
+            items.append(item.strip())
+        if items:
+            yield current_key[0], items
+
+def iter_wide_baskets(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            items = [item.strip() for item in row[1:] if item.strip()]
+            if items:
+                yield None, items
+
+def iter_basket_file(path):
+    with open(path, encoding="utf-8-sig") as f:
+        header = f.readline()
+    if header.startswith("Item(s)"):
+        return iter_wide_baskets(path)
+    return iter_dated_baskets(path)
+
+class BasketStore:
+    MAGIC = b"BASKETS1"
+    HEADER = struct.Struct("<8sBxxxxxxxQQQQ")
+    
+    def __init__(self, item_names, offsets, indices, dates, buffer=None):
+        self.item_names = item_names
+        self.offsets = offsets
+        self.indices = indices
+        self.dates = dates
+        self._buffer = buffer
+        self._item_ids = None
+    
+    @classmethod
+    def from_baskets(cls, baskets):
+        item_ids = {}
+        item_names = []
+        offsets = array("Q", [0])
+        indices = array("I")
+        dates = array("I")
+        for date, names in baskets:
+            basket = set()
+            for name in names:
+                item_id = item_ids.get(name)
+                if item_id is None:
+                    item_id = item_ids[name] = len(item_names)
+                    item_names.append(name)
+                basket.add(item_id)
+            indices.extend(sorted(basket))
+            offsets.append(len(indices))
+            dates.append(datetime.date.fromisoformat(date).toordinal() if date else 0)
+        store = cls(item_names, offsets, indices, dates)
+        store._item_ids = item_ids
+        return store
+    
+    @classmethod
+    def from_file(cls, path):
+        return cls.from_baskets(iter_basket_file(path))
+    
+    def save(self, path):
+        names = "\n".join(self.item_names).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(
+                self.MAGIC, sys.byteorder == "little",
+                len(self.dates), len(self.indices), len(self.item_names), len(names)))
+            for section in (self.offsets, self.indices, self.dates):
+                data = section.tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % 8))
+            f.write(names)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, little_endian, basket_count, index_count, item_count, names_size = \
+            cls.HEADER.unpack_from(buffer)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a basket store")
+        if little_endian != (sys.byteorder == "little"):
+            raise ValueError(f"{path} was written on a machine with different byte order")
+        return cls(*cls._map_sections(buffer), buffer)
+    
+    @classmethod
+    def _map_sections(cls, buffer):
+        _, _, basket_count, index_count, item_count, names_size = cls.HEADER.unpack_from(buffer)
+        view = memoryview(buffer)
+        position = cls.HEADER.size
+        sections = []
+        for typecode, count in (("Q", basket_count + 1), ("I", index_count), ("I", basket_count)):
+            size = count * array(typecode).itemsize
+            sections.append(view[position:position + size].cast(typecode))
+            position += size + (-size % 8)
+        names = bytes(view[position:position + names_size]).decode("utf-8")
+        item_names = names.split("\n") if item_count else []
+        return (item_names, *sections)
+    
+    def close(self):
+        if self._buffer is None:
+            return
+        self.offsets.release()
+        self.indices.release()
+        self.dates.release()
+        try:
+            self._buffer.close()
+        except BufferError:
+            # Кто-то ещё держит корзину из basket() или __iter__: оставляем хранилище рабочим
+            _, self.offsets, self.indices, self.dates = self._map_sections(self._buffer)
+            raise BufferError(
+                "basket views are still in use; release them before closing the store") from None
+        self._buffer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def basket(self, position):
+        return self.indices[self.offsets[position]:self.offsets[position + 1]]
+    
+    def __iter__(self):
+        indices = self.indices
+        offsets = self.offsets
+        for position in range(len(offsets) - 1):
+            yield indices[offsets[position]:offsets[position + 1]]
+    
+    def item_id(self, name):
+        if self._item_ids is None:
+            self._item_ids = {name: item_id for item_id, name in enumerate(self.item_names)}
+        return self._item_ids[name]
+    
+    def item_counts(self):
+        counts = array("Q", bytes(8 * len(self.item_names)))
+        for item_id in self.indices:
+            counts[item_id] += 1
+        return counts
+    
+    def co_occurrence(self, item_id):
+        counts = array("Q", bytes(8 * len(self.item_names)))
+        for basket in self:
+            position = bisect.bisect_left(basket, item_id)
+            if position < len(basket) and basket[position] == item_id:
+                for other in basket:
+                    counts[other] += 1
+        counts[item_id] = 0
+        return counts
+
+def count_co_occurrences(baskets, max_size=3):
+    counts = collections.Counter()
+    for basket in baskets:
+        for size in range(2, max_size + 1):
+            counts.update(itertools.combinations(basket, size))
+    return counts
+
+# Набор (a, b, c) по возрастанию номеров хранится как ключ (a * n + b) * n + c, где n —
+# число товаров, в отдельном словаре для каждого размера: такие словари в разы быстрее
+# передаются между процессами и сливаются, чем Counter с ключами-кортежами
+class ItemsetCounts:
+    def __init__(self, item_count, counts_by_size):
+        self.item_count = item_count
+        self.counts_by_size = counts_by_size
+    
+    def _encode(self, itemset):
+        key = 0
+        for item in sorted(itemset):
+            key = key * self.item_count + item
+        return key
+    
+    def _decode(self, key, size):
+        itemset = []
+        for _ in range(size):
+            key, item = divmod(key, self.item_count)
+            itemset.append(item)
+        return tuple(reversed(itemset))
+    
+    def __getitem__(self, itemset):
+        counts = self.counts_by_size.get(len(itemset), {})
+        return counts.get(self._encode(itemset), 0)
+    
+    def __len__(self):
+        return sum(len(counts) for counts in self.counts_by_size.values())
+    
+    def items(self):
+        for size, counts in self.counts_by_size.items():
+            for key, count in counts.items():
+                yield self._decode(key, size), count
+    
+    def most_common(self, limit, size=None):
+        sizes = self.counts_by_size if size is None else (size,)
+        best = heapq.nlargest(limit, ((count, key, size) for size in sizes
+                                      for key, count in self.counts_by_size[size].items()))
+        return [(self._decode(key, size), count) for count, key, size in best]
+
+def _count_basket_range(store_path, start, end, max_size, shards):
+    # Первая фаза: считаем свой диапазон дат и раскладываем ключи по шардам для слияния.
+    # Считать выгоднее кортежами (Counter целиком на C), а упаковывать уже различные наборы
+    with BasketStore.load(store_path) as store:
+        item_count = len(store.item_names)
+        counts = count_co_occurrences(
+            (store.basket(position).tolist() for position in range(start, end)), max_size)
+    sharded = [{size: (array("Q"), array("Q")) for size in range(2, max_size + 1)}
+               for _ in range(shards)]
+    for itemset, count in counts.items():
+        key = 0
+        for item in itemset:
+            key = key * item_count + item
+        keys, values = sharded[key % shards][len(itemset)]
+        keys.append(key)
+        values.append(count)
+    return sharded
+
+def _merge_shard(parts, min_count):
+    # Вторая фаза: у каждого шарда свои ключи, поэтому процессы сливают их независимо
+    merged = {}
+    for part in parts:
+        for size, (keys, values) in part.items():
+            counts = merged.setdefault(size, {})
+            if not counts:
+                counts.update(zip(keys, values))
+                continue
+            for key, count in zip(keys, values):
+                counts[key] = counts.get(key, 0) + count
+    if min_count > 1:
+        merged = {size: {key: count for key, count in counts.items() if count >= min_count}
+                  for size, counts in merged.items()}
+    return merged
+
+def _date_partitions(dates, parts):
+    total = len(dates)
+    bounds = [0]
+    for part in range(1, parts):
+        cut = max(bounds[-1], total * part // parts)
+        # У корзин без даты (день 0) границу не сдвигаем: режем поровну по числу корзин
+        while 0 < cut < total and dates[cut] and dates[cut] == dates[cut - 1]:
+            cut += 1
+        if cut > bounds[-1]:
+            bounds.append(cut)
+    if bounds[-1] < total:
+        bounds.append(total)
+    return list(zip(bounds, bounds[1:]))
+
+def parallel_co_occurrences(store_path, max_size=3, workers=None, min_count=1):
+    workers = workers or os.cpu_count() or 1
+    with BasketStore.load(store_path) as store:
+        item_count = len(store.item_names)
+        partitions = _date_partitions(store.dates, workers)
+    
+    counts_by_size = {size: {} for size in range(2, max_size + 1)}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        sharded = list(pool.map(_count_basket_range, itertools.repeat(store_path),
+                                *zip(*partitions), itertools.repeat(max_size),
+                                itertools.repeat(workers)))
+        merged = pool.map(_merge_shard, [[parts[shard] for parts in sharded]
+                                         for shard in range(workers)],
+                          itertools.repeat(min_count))
+        for shard_counts in merged:
+            for size, counts in shard_counts.items():
+                counts_by_size[size].update(counts)
+    return ItemsetCounts(item_count, counts_by_size)
+
+class AssociationRule:
+    def __init__(self, antecedent, consequent, support, confidence, lift):
+        self.antecedent = antecedent
+        self.consequent = consequent
+        self.support = support
+        self.confidence = confidence
+        self.lift = lift
+
+def _build_fp_tree(weighted_baskets, min_count):
+    counts = {}
+    for items, count in weighted_baskets:
+        for item in items:
+            counts[item] = counts.get(item, 0) + count
+    frequent = {item: count for item, count in counts.items() if count >= min_count}
+    rank = {item: position for position, item in enumerate(
+        sorted(frequent, key=lambda item: (-frequent[item], item)))}
+    
+    node_item = [None]
+    node_count = [0]
+    node_parent = [-1]
+    children = {}
+    header = {}
+    for items, count in weighted_baskets:
+        node = 0
+        for item in sorted((item for item in items if item in rank), key=rank.__getitem__):
+            child = children.get((node, item))
+            if child is None:
+                child = len(node_item)
+                node_item.append(item)
+                node_count.append(0)
+                node_parent.append(node)
+                children[(node, item)] = child
+                header.setdefault(item, []).append(child)
+            node_count[child] += count
+            node = child
+    return frequent, header, node_item, node_count, node_parent
+
+def _mine_fp_tree(tree, suffix, min_count, max_length, itemsets):
+    frequent, header, node_item, node_count, node_parent = tree
+    for item in sorted(frequent, key=lambda item: (frequent[item], item)):
+        itemset = suffix + (item,)
+        itemsets[frozenset(itemset)] = frequent[item]
+        if max_length is not None and len(itemset) >= max_length:
+            continue
+        conditional = []
+        for node in header[item]:
+            path = []
+            parent = node_parent[node]
+            while parent > 0:
+                path.append(node_item[parent])
+                parent = node_parent[parent]
+            if path:
+                conditional.append((path, node_count[node]))
+        if conditional:
+            subtree = _build_fp_tree(conditional, min_count)
+            if subtree[0]:
+                _mine_fp_tree(subtree, itemset, min_count, max_length, itemsets)
+
+def mine_frequent_itemsets(basket_source, min_support, max_length=None):
+    counts = {}
+    basket_count = 0
+    for items in basket_source():
+        basket_count += 1
+        for item in set(items):
+            counts[item] = counts.get(item, 0) + 1
+    min_count = max(1, math.ceil(min_support * basket_count))
+    frequent = {item for item, count in counts.items() if count >= min_count}
+    
+    baskets = {}
+    for items in basket_source():
+        key = tuple(sorted(item for item in set(items) if item in frequent))
+        if key:
+            baskets[key] = baskets.get(key, 0) + 1
+    
+    itemsets = {}
+    tree = _build_fp_tree(list(baskets.items()), min_count)
+    _mine_fp_tree(tree, (), min_count, max_length, itemsets)
+    return itemsets, basket_count
+
+def generate_association_rules(itemsets, basket_count, min_confidence):
+    rules = []
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        items = tuple(itemset)
+        for size in range(1, len(items)):
+            for antecedent in itertools.combinations(items, size):
+                antecedent = frozenset(antecedent)
+                confidence = count / itemsets[antecedent]
+                if confidence < min_confidence:
+                    continue
+                consequent = itemset - antecedent
+                lift = confidence * basket_count / itemsets[consequent]
+                rules.append(AssociationRule(
+                    antecedent, consequent, count / basket_count, confidence, lift))
+    rules.sort(key=lambda rule: (-rule.confidence, -rule.lift))
+    return rules
+
+class AssociationRules:
+    def __init__(self, rules):
+        self.rules = rules
+        self._by_antecedent = {}
+        for rule in rules:
+            self._by_antecedent.setdefault(rule.antecedent, []).append(rule)
+        self._max_antecedent = max((len(rule.antecedent) for rule in rules), default=0)
+    
+    def suggest(self, items, limit=5, allowed=None):
+        items = set(items)
+        scores = {}
+        for size in range(1, min(self._max_antecedent, len(items)) + 1):
+            for antecedent in itertools.combinations(items, size):
+                for rule in self._by_antecedent.get(frozenset(antecedent), ()):
+                    for item in rule.consequent - items:
+                        if allowed is not None and item not in allowed:
+                            continue
+                        score = rule.confidence * rule.lift
+                        if score > scores.get(item, 0):
+                            scores[item] = score
+        return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+PURCHASE_HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "groceries - groceries.csv")
+
+# Товары из чеков называются по-английски, ингредиенты — по-русски: товар из чека,
+# название для списка покупок и начала слов, по которым его узнаём в ингредиентах
+PURCHASE_ITEMS = {
+    "whole milk": ("Молоко", ("молоко",)),
+    "butter": ("Масло сливочное", ("масло сливочное", "сливочное масло")),
+    "domestic eggs": ("Яйца", ("яйцо",)),
+    "flour": ("Мука", ("мука",)),
+    "sugar": ("Сахар", ("сахар",)),
+    "salt": ("Соль", ("соль",)),
+    "oil": ("Масло растительное", ("масло растительное", "масло оливковое")),
+    "rice": ("Рис", ("рис",)),
+    "pasta": ("Макароны", ("спагетти", "макароны", "лапша")),
+    "beef": ("Говядина", ("говядина", "говяжий")),
+    "pork": ("Свинина", ("свинина", "свиной")),
+    "chicken": ("Курица", ("курица", "куриный")),
+    "turkey": ("Индейка", ("индейка",)),
+    "hamburger meat": ("Фарш", ("фарш",)),
+    "ham": ("Ветчина", ("ветчина",)),
+    "sausage": ("Колбаса", ("колбаса", "сосиски")),
+    "fish": ("Рыба", ("рыба", "лосось", "треска", "форель")),
+    "hard cheese": ("Сыр", ("сыр",)),
+    "cream": ("Сливки", ("сливки",)),
+    "whipped/sour cream": ("Сметана", ("сметана",)),
+    "curd": ("Творог", ("творог",)),
+    "yogurt": ("Йогурт", ("йогурт",)),
+    "onions": ("Лук", ("лук",)),
+    "root vegetables": ("Корнеплоды", ("морковь", "картофель", "свёкла")),
+    "other vegetables": ("Овощи", ("помидоры", "огурцы", "перец болгарский", "капуста",
+                                   "кабачок", "баклажан")),
+    "citrus fruit": ("Цитрусовые", ("лимон", "апельсин", "лайм")),
+    "herbs": ("Зелень", ("зелень", "петрушка", "укроп", "базилик")),
+    "honey": ("Мёд", ("мёд",)),
+    "mayonnaise": ("Майонез", ("майонез",)),
+    "mustard": ("Горчица", ("горчица",)),
+    "vinegar": ("Уксус", ("уксус",)),
+    "white bread": ("Хлеб", ("хлеб", "батон")),
+    "rolls/buns": ("Булочки", ("булочки",)),
+    "coffee": ("Кофе", ("кофе",)),
+    "tea": ("Чай", ("чай",)),
+    "chocolate": ("Шоколад", ("шоколад",)),
+}
+_PURCHASE_ITEM_TERMS = [(item, [tokenize(keyword) for keyword in keywords])
+                        for item, (_, keywords) in PURCHASE_ITEMS.items()]
+
+def purchase_items(ingredient_names):
+    items = set()
+    for name in ingredient_names:
+        terms = tokenize(name)
+        for item, keywords in _PURCHASE_ITEM_TERMS:
+            if any(all(any(term.startswith(prefix) for term in terms) for prefix in keyword)
+                   for keyword in keywords):
+                items.add(item)
+    return items
+
+class PopularityCounter:
+    HALF_LIFE_DAYS = 7
+    VIEW_WEIGHT = 1
+    COOK_WEIGHT = 3
+    MAX_EXPONENT = 500
+    
+    def __init__(self, scores=None, landmark=None, half_life_days=HALF_LIFE_DAYS):
+        # Прямое затухание: вес события растёт как exp(rate * (t - landmark)),
+        # поэтому сохранённые счёты не нужно пересчитывать с течением времени
+        self.scores = dict(scores or {})
+        self.landmark = int(time.time()) if landmark is None else landmark
+        self._rate = math.log(2) / (half_life_days * 86400)
+        self._heap = []
+        self._compact()
+    
+    def _compact(self):
+        self._heap = [(-score, recipe_id) for recipe_id, score in self.scores.items()]
+        heapq.heapify(self._heap)
+    
+    def _rebase(self, now):
+        factor = math.exp(-(now - self.landmark) * self._rate)
+        self.scores = {recipe_id: score * factor for recipe_id, score in self.scores.items()}
+        self.landmark = now
+        self._compact()
+    
+    def record(self, recipe_id, weight=VIEW_WEIGHT, now=None):
+        now = int(time.time()) if now is None else now
+        if (now - self.landmark) * self._rate > self.MAX_EXPONENT:
+            self._rebase(now)
+        score = self.scores.get(recipe_id, 0) + weight * math.exp((now - self.landmark) * self._rate)
+        self.scores[recipe_id] = score
+        heapq.heappush(self._heap, (-score, recipe_id))
+        if len(self._heap) > 2 * len(self.scores) + 64:
+            self._compact()
+        return score
+    
+    def remove(self, recipe_id):
+        self.scores.pop(recipe_id, None)
+    
+    def current_score(self, recipe_id, now=None):
+        now = int(time.time()) if now is None else now
+        return self.scores.get(recipe_id, 0) * math.exp(-(now - self.landmark) * self._rate)
+    
+    def top(self, limit):
+        found = []
+        while self._heap and len(found) < limit:
+            neg_score, recipe_id = heapq.heappop(self._heap)
+            if self.scores.get(recipe_id) == -neg_score:
+                found.append((neg_score, recipe_id))
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [recipe_id for _, recipe_id in found]
+
+def as_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    if hasattr(value, "toPyDate"):
+        return value.toPyDate()
+    return datetime.date.fromisoformat(value)
+
+class MenuStore:
+    MEAL_TYPES = ("Завтрак", "Обед", "Ужин")
+    
+    def __init__(self, slots=()):
+        self._days = {}
+        for date, meal_type, recipe in slots:
+            self._days.setdefault(as_date(date), {})[meal_type] = recipe
+        self._dates = sorted(self._days)
+        self._listeners = []
+    
+    def __len__(self):
+        return len(self._dates)
+    
+    def get_day(self, date):
+        day = dict.fromkeys(self.MEAL_TYPES)
+        day.update(self._days.get(as_date(date), {}))
+        return day
+    
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+    
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+    
+    def set(self, date, meal_type, recipe):
+        date = as_date(date)
+        day = self._days.get(date)
+        old = day.get(meal_type) if day is not None else None
+        if recipe is not None:
+            if day is None:
+                day = self._days[date] = {}
+                bisect.insort(self._dates, date)
+            day[meal_type] = recipe
+        elif old is not None:
+            del day[meal_type]
+            if not day:
+                del self._days[date]
+                del self._dates[bisect.bisect_left(self._dates, date)]
+        if old is not recipe:
+            for listener in list(self._listeners):
+                listener(date, meal_type, old, recipe)
+    
+    def remove_recipe(self, recipe_id):
+        removed = [(date, meal_type) for date in self._dates
+                   for meal_type, recipe in self._days[date].items() if recipe.id == recipe_id]
+        for date, meal_type in removed:
+            self.set(date, meal_type, None)
+        return removed
+    
+    def replace_recipe(self, recipe):
+        replaced = [(date, meal_type) for date in self._dates
+                    for meal_type, planned in self._days[date].items() if planned.id == recipe.id]
+        for date, meal_type in replaced:
+            self.set(date, meal_type, recipe)
+        return replaced
+    
+    def is_planned(self, date):
+        return as_date(date) in self._days
+    
+    def dates(self, start_date, end_date):
+        lo = bisect.bisect_left(self._dates, as_date(start_date))
+        hi = bisect.bisect_right(self._dates, as_date(end_date))
+        return self._dates[lo:hi]
+    
+    def slots(self, start_date, end_date):
+        for date in self.dates(start_date, end_date):
+            day = self._days[date]
+            for meal_type in sorted(day, key=self._meal_order):
+                yield date, meal_type, day[meal_type]
+    
+    def week(self, date):
+        date = as_date(date)
+        start = date - datetime.timedelta(days=date.weekday())
+        return self.slots(start, start + datetime.timedelta(days=6))
+    
+    def month(self, date):
+        date = as_date(date)
+        start = date.replace(day=1)
+        end = (start + datetime.timedelta(days=31)).replace(day=1) - datetime.timedelta(days=1)
+        return self.slots(start, end)
+    
+    def _meal_order(self, meal_type):
+        if meal_type in self.MEAL_TYPES:
+            return self.MEAL_TYPES.index(meal_type), meal_type
+        return len(self.MEAL_TYPES), meal_type
+
+class ShoppingListView:
+    def __init__(self, menu, load_ingredients, start_date, end_date, servings=None):
+        self.menu = menu
+        self.load_ingredients = load_ingredients
+        self.start_date = as_date(start_date)
+        self.end_date = as_date(end_date)
+        self.servings = servings
+        self._deltas = {}
+        self._recipe_counts = collections.Counter()
+        self._totals = {}
+        
+        slots = list(menu.slots(self.start_date, self.end_date))
+        self._load([recipe.id for _, _, recipe in slots])
+        for _, _, recipe in slots:
+            self._apply(recipe.id, 1)
+        # Меню держит подписчиков сильно: через слабую ссылку забытое представление
+        # собирается сборщиком и само отписывается при следующем изменении меню
+        method = weakref.WeakMethod(self._on_menu_changed)
+        def listener(*change):
+            on_menu_changed = method()
+            if on_menu_changed is None:
+                menu.unsubscribe(listener)
+            else:
+                on_menu_changed(*change)
+        self._listener = listener
+        menu.subscribe(listener)
+    
+    def close(self):
+        if self._listener is not None:
+            self.menu.unsubscribe(self._listener)
+            self._listener = None
+    
+    def _load(self, recipe_ids):
+        missing = [recipe_id for recipe_id in dict.fromkeys(recipe_ids)
+                   if recipe_id not in self._deltas]
+        if not missing:
+            return
+        for recipe_id, ingredients in self.load_ingredients(missing, self.servings).items():
+            deltas = []
+            for name, amount, unit in ingredients:
+                unit = UNITS.get(unit)
+                deltas.append(((name, UNITS.base_unit(unit)), amount * unit.factor))
+            self._deltas[recipe_id] = deltas
+    
+    def _apply(self, recipe_id, times):
+        self._load([recipe_id])
+        self._recipe_counts[recipe_id] += times
+        if self._recipe_counts[recipe_id] <= 0:
+            del self._recipe_counts[recipe_id]
+        for key, amount in self._deltas.get(recipe_id, ()):
+            total = self._totals.setdefault(key, [0, 0])
+            total[0] += amount * times
+            total[1] += times
+            if total[1] <= 0:
+                del self._totals[key]
+    
+    def _on_menu_changed(self, date, meal_type, old_recipe, new_recipe):
+        if not self.start_date <= date <= self.end_date:
+            return
+        if old_recipe is not None:
+            self._apply(old_recipe.id, -1)
+        if new_recipe is not None:
+            self._apply(new_recipe.id, 1)
+    
+    def recipe_changed(self, recipe_id):
+        times = self._recipe_counts.get(recipe_id, 0)
+        if times:
+            self._apply(recipe_id, -times)
+        self._deltas.pop(recipe_id, None)
+        if times:
+            self._apply(recipe_id, times)
+    
+    def items(self):
+        return build_shopping_list(
+            (name, amount, base_unit.name, 1)
+            for (name, base_unit), (amount, _) in self._totals.items())
+
+# Ключевые слова сравниваются с началом слов названия ингредиента
+DIET_EXCLUDED_INGREDIENTS = {
+    "Вегетарианство": ("мясо", "говядина", "говяжий", "свинина", "свиной", "баранина",
+                       "баранья", "телятина", "телячий", "курица", "куриный", "курятина",
+                       "окорочка", "индейка", "индюшка", "индюшачий", "утка", "утиный",
+                       "гусиный", "кролик", "кроличий", "бекон", "ветчина", "колбаса",
+                       "сосиски", "сардельки", "фарш", "рыба", "рыбный", "лосось", "семга",
+                       "форель", "скумбрия", "треска", "минтай", "сельдь", "тунец", "анчоусы",
+                       "креветки", "кальмар", "мидии", "краб", "желатин"),
+    "Без глютена": ("мука", "хлеб", "батон", "сухари", "спагетти", "макароны", "лапша",
+                    "манка", "манная", "булгур", "кускус", "ячмень", "перловка", "пшеница",
+                    "пшеничный", "ржаной", "лаваш", "панировочные", "соевый соус",
+                    "баранки", "печенье", "пряники", "вафли", "крекеры"),
+}
+# Короткие слова, которые совпадают только целиком: «паста», но не «пастила»,
+# «печень», но не «печенье», «сало», но не «салат»
+DIET_EXCLUDED_WORDS = {
+    "Вегетарианство": ("бараний", "гусь", "печень", "сало"),
+    "Без глютена": ("паста", "тесто"),
+}
+DIET_EXCLUDED_INGREDIENTS["Веганство"] = DIET_EXCLUDED_INGREDIENTS["Вегетарианство"] + (
+    "яйцо", "яичный", "молоко", "молочный", "сливки", "сливочный", "сметана", "творог", "сыр",
+    "йогурт", "кефир", "майонез", "мёд")
+DIET_EXCLUDED_WORDS["Веганство"] = DIET_EXCLUDED_WORDS["Вегетарианство"]
+# Уточнения, при которых ключевое слово не исключает ингредиент:
+# кокосовое молоко веганству не мешает, томатная паста — безглютеновой диете
+_PLANT_BASED = ("кокосовый", "соевый", "миндальный", "овсяный", "рисовый", "растительный")
+DIET_KEYWORD_EXCEPTIONS = dict.fromkeys(
+    ("молоко", "сливки", "сливочный", "йогурт", "сыр", "майонез"), _PLANT_BASED)
+DIET_KEYWORD_EXCEPTIONS["паста"] = ("томатный", "ореховый", "кунжутный", "чесночный",
+                                    "перечный", "карри")
+
+def _keyword_terms(keyword, whole_word=False):
+    terms = tokenize(keyword)
+    exceptions = tuple(normalize_token(word)
+                       for word in DIET_KEYWORD_EXCEPTIONS.get(keyword, ()))
+    return terms, whole_word, exceptions
+
+_DIET_EXCLUDED_TERMS = {
+    diet: [_keyword_terms(keyword) for keyword in keywords]
+          + [_keyword_terms(word, whole_word=True)
+             for word in DIET_EXCLUDED_WORDS.get(diet, ())]
+    for diet, keywords in DIET_EXCLUDED_INGREDIENTS.items()}
+
+def excluded_by_diet(ingredient_name, diet):
+    # Совпадение по началу слов: «курица» не задевает «куркуму»;
+    # короткие слова вроде «паста» сравниваются целиком, чтобы не задеть «пастилу»
+    terms = tokenize(ingredient_name)
+    for keyword, whole_word, exceptions in _DIET_EXCLUDED_TERMS.get(diet, ()):
+        if whole_word:
+            matched = all(word in terms for word in keyword)
+        else:
+            matched = all(any(term.startswith(prefix) for term in terms) for prefix in keyword)
+        if matched and not (exceptions and any(term.startswith(exceptions) for term in terms)):
+            return True
+    return False
+
+class MenuPlanner:
+    def __init__(self, candidates, repeat_window=7, fixed=(), seed=None):
+        self.candidates = candidates
+        self.repeat_window = repeat_window
+        self.fixed = list(fixed)
+        self.random = random.Random(seed)
+        self.unfilled = []
+        self._occurrences = {}
+    
+    def _add_occurrence(self, recipe_id, day):
+        bisect.insort(self._occurrences.setdefault(recipe_id, []), day)
+    
+    def _remove_occurrence(self, recipe_id, day):
+        days = self._occurrences[recipe_id]
+        del days[bisect.bisect_left(days, day)]
+    
+    def _distance(self, recipe_id, day):
+        days = self._occurrences.get(recipe_id)
+        if not days:
+            return math.inf
+        i = bisect.bisect_left(days, day)
+        after = days[i] - day if i < len(days) else math.inf
+        before = day - days[i - 1] if i > 0 else math.inf
+        return min(after, before)
+    
+    def _is_free(self, recipe_id, day):
+        return self._distance(recipe_id, day) >= self.repeat_window
+    
+    def _pick(self, pool, start, day):
+        for step in range(len(pool)):
+            position = (start + step) % len(pool)
+            if self._is_free(pool[position], day):
+                return position, True
+        # Кандидатов меньше, чем дней в окне: берём самый давно использованный рецепт
+        position = max(range(len(pool)), key=lambda i: self._distance(pool[i], day))
+        return position, False
+    
+    def plan(self, dates, meal_types):
+        taken = set()
+        for date, meal_type, recipe_id in self.fixed:
+            taken.add((date, meal_type))
+            self._add_occurrence(recipe_id, date.toordinal())
+        
+        pools = {}
+        for meal_type in meal_types:
+            pool = list(self.candidates.get(meal_type, ()))
+            self.random.shuffle(pool)
+            pools[meal_type] = pool
+        positions = dict.fromkeys(meal_types, 0)
+        
+        planned = []
+        conflicts = []
+        self.unfilled = []
+        for date in dates:
+            day = date.toordinal()
+            for meal_type in meal_types:
+                if (date, meal_type) in taken:
+                    continue
+                pool = pools[meal_type]
+                if not pool:
+                    self.unfilled.append((date, meal_type))
+                    continue
+                position, free = self._pick(pool, positions[meal_type], day)
+                positions[meal_type] = position + 1
+                recipe_id = pool[position]
+                self._add_occurrence(recipe_id, day)
+                if not free:
+                    conflicts.append(len(planned))
+                planned.append([date, meal_type, recipe_id])
+        
+        self._repair(planned, conflicts)
+        
+        # Что не удалось развести, оставляем пустым: правило «без повторов» важнее полноты
+        for i in conflicts:
+            date, meal_type, recipe_id = planned[i]
+            if not self._is_free_without(recipe_id, date.toordinal()):
+                self._remove_occurrence(recipe_id, date.toordinal())
+                planned[i] = None
+                self.unfilled.append((date, meal_type))
+        self.unfilled.sort()
+        return [tuple(slot) for slot in planned if slot is not None]
+    
+    def _repair(self, planned, conflicts):
+        # Локальный поиск: пытаемся развести повторы обменом блюд между слотами
+        for i in conflicts:
+            date, meal_type, recipe_id = planned[i]
+            day = date.toordinal()
+            if self._is_free_without(recipe_id, day):
+                continue
+            for j, (other_date, other_meal_type, other_id) in enumerate(planned):
+                if other_meal_type != meal_type or other_id == recipe_id:
+                    continue
+                other_day = other_date.toordinal()
+                self._remove_occurrence(recipe_id, day)
+                self._remove_occurrence(other_id, other_day)
+                if self._is_free(recipe_id, other_day) and self._is_free(other_id, day):
+                    self._add_occurrence(recipe_id, other_day)
+                    self._add_occurrence(other_id, day)
+                    planned[i][2], planned[j][2] = other_id, recipe_id
+                    break
+                self._add_occurrence(recipe_id, day)
+                self._add_occurrence(other_id, other_day)
+    
+    def _is_free_without(self, recipe_id, day):
+        self._remove_occurrence(recipe_id, day)
+        free = self._is_free(recipe_id, day)
+        self._add_occurrence(recipe_id, day)
+        return free
 
 class DataRepository:
     _instance = None
@@ -34,61 +1383,699 @@ class DataRepository:
             cls._instance = DataRepository()
         return cls._instance
     
-    def __init__(self):
-        self.recipes = [
+    # Индексы, которые строятся в фоне при первом обращении, со своим соединением к базе
+    BACKGROUND_INDEXES = {
+        "_search_index": "_build_search_index",
+        "_ingredient_index": "_build_ingredient_index",
+        "_similarity_index": "_build_similarity_index",
+        "_purchase_rules": "_build_purchase_rules",
+    }
+    SUGGESTION_MIN_SUPPORT = 0.005
+    SUGGESTION_MIN_CONFIDENCE = 0.2
+    
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self._create_schema()
+        self._search_index = None
+        self._ingredient_index = None
+        self._similarity_index = None
+        self._similar_cache = {}
+        self._purchase_rules = None
+        # Защищает фоновые индексы: правки рецептов увеличивают версию, и построенный
+        # по устаревшему снимку базы индекс выбрасывается
+        self._index_lock = threading.Lock()
+        self._index_version = 0
+        self._index_futures = {}
+        row = self.db.execute(
+            "SELECT value FROM counters WHERE name = 'next_recipe_id'").fetchone()
+        if row is None:
+            self._next_recipe_id = 1
+            self.add_recipes(self._default_recipes())
+        else:
+            self._next_recipe_id = row[0]
+        self.menu = self._load_menu()
+        self.popularity = self._load_popularity()
+        self._shopping_views = weakref.WeakSet()
+        self.user_preferences = {
+            'name': 'Пользователь',
+            'diet': 'Нет',
+            'notifications': True
+        }
+    
+    def _create_schema(self):
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS recipes (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    image TEXT,
+                    servings INTEGER NOT NULL DEFAULT 2
+                );
+                CREATE INDEX IF NOT EXISTS recipes_by_category ON recipes (category, id);
+                CREATE TABLE IF NOT EXISTS ingredients (
+                    recipe_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    amount NUMERIC NOT NULL,
+                    unit TEXT NOT NULL,
+                    PRIMARY KEY (recipe_id, position)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ingredients_by_name ON ingredients (name, recipe_id);
+                CREATE TABLE IF NOT EXISTS steps (
+                    recipe_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (recipe_id, position)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS menu (
+                    date TEXT NOT NULL,
+                    meal_type TEXT NOT NULL,
+                    recipe_id INTEGER NOT NULL,
+                    PRIMARY KEY (date, meal_type)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS popularity (
+                    recipe_id INTEGER PRIMARY KEY,
+                    score REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                );
+                CREATE TABLE IF NOT EXISTS baskets (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT,
+                    source TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS baskets_by_source ON baskets (source);
+                CREATE TABLE IF NOT EXISTS basket_items (
+                    basket_id INTEGER NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    PRIMARY KEY (basket_id, item_id)
+                ) WITHOUT ROWID;
+            """)
+            columns = {row[1] for row in self.db.execute("PRAGMA table_info(recipes)")}
+            if "servings" not in columns:
+                self.db.execute(
+                    "ALTER TABLE recipes ADD COLUMN servings INTEGER NOT NULL DEFAULT 2")
+    
+    def _default_recipes(self):
+        return [
             Recipe(1, "Омлет с овощами", "Завтрак", 15,
                   [Ingredient("Яйца", 3, "шт"), Ingredient("Помидоры", 1, "шт"), Ingredient("Лук", 0.5, "шт"), Ingredient("Масло растительное", 1, "ст.л")],
                   ["1. Взбить яйца", 
                    "2. Нарезать овощи мелкими кубиками", 
                    "3. Взбить яйца с солью и перцем", 
                    "4. Обжарить лук до прозрачности",
-                   "5. Добавить помидоры, обжарить 2 минуты",]),
+                   "5. Добавить помидоры, обжарить 2 минуты",], servings=1),
             Recipe(2, "Салат Цезарь", "Обед", 20,
                   [Ingredient("Куриная грудка", 200, "г"), Ingredient("Салат Айсберг", 100, "г"), Ingredient("Сухарики", 50, "г"), Ingredient("Сыр Пармезан", 30, "г"), Ingredient("Соус Цезарь", 2, "ст.л")],
                   ["1. Обжарить куриную грудку до готовности",
                     "2. Порвать салат руками на крупные куски",
                     "3. Нарезать курицу ломтиками",
                     "4. Смешать все ингредиенты в большой миске",
-                    "5. Заправить соусом и посыпать пармезаном"]),
+                    "5. Заправить соусом и посыпать пармезаном"], servings=2),
             Recipe(3, "Паста Карбонара", "Ужин", 30,
                   [Ingredient("Спагетти", 200, "г"), Ingredient("Бекон", 150, "г"), Ingredient("Яйца", 2, "шт"), Ingredient("Сыр Пармезан", 50, "г"), Ingredient("Чеснок", 2, "зубчика"),],
                   ["1. Отварить пасту согласно инструкции на упаковке",
                     "2. Обжарить бекон до хрустящей корочки",
                     "3. Взбить яйца с тертым пармезаном и черным перцем",
                     "4. Добавить к яйцам горячую пасту и бекон, быстро перемешать",
-                    "5. Подавать сразу же, посыпав дополнительно пармезаном"])
+                    "5. Подавать сразу же, посыпав дополнительно пармезаном"], servings=2)
         ]
-        self.menu = {}
-        self.user_preferences = {
-            'name': 'Пользователь',
-            'diet': 'Нет',
-            'notifications': True
-        }
+    
+    def _recipe_summary(self, row):
+        recipe_id, title, category, time, image = row
+        return Recipe(recipe_id, title, category, time, None, None, image)
+    
+    def _write_recipe_details(self, recipe):
+        self.db.executemany(
+            "INSERT INTO ingredients (recipe_id, position, name, amount, unit) VALUES (?, ?, ?, ?, ?)",
+            [(recipe.id, position, ing.name, ing.amount, ing.unit)
+             for position, ing in enumerate(recipe.ingredients)])
+        self.db.executemany(
+            "INSERT INTO steps (recipe_id, position, text) VALUES (?, ?, ?)",
+            [(recipe.id, position, step) for position, step in enumerate(recipe.steps)])
+    
+    def _delete_recipe_details(self, recipe_id):
+        self.db.execute("DELETE FROM ingredients WHERE recipe_id = ?", (recipe_id,))
+        self.db.execute("DELETE FROM steps WHERE recipe_id = ?", (recipe_id,))
+    
+    def _load_menu(self):
+        rows = self.db.execute("""
+            SELECT m.date, m.meal_type, r.id, r.title, r.category, r.time, r.image
+            FROM menu m JOIN recipes r ON r.id = m.recipe_id
+        """)
+        return MenuStore((date, meal_type, self._recipe_summary(recipe_row))
+                         for date, meal_type, *recipe_row in rows)
+    
+    def _load_popularity(self):
+        row = self.db.execute(
+            "SELECT value FROM counters WHERE name = 'popularity_landmark'").fetchone()
+        scores = dict(self.db.execute("SELECT recipe_id, score FROM popularity"))
+        return PopularityCounter(scores, row[0] if row else None)
+    
+    def _record_popularity(self, recipe_id, weight):
+        landmark = self.popularity.landmark
+        score = self.popularity.record(recipe_id, weight)
+        with self.db:
+            if self.popularity.landmark != landmark:
+                self.db.execute("DELETE FROM popularity")
+                self.db.executemany(
+                    "INSERT INTO popularity (recipe_id, score) VALUES (?, ?)",
+                    self.popularity.scores.items())
+            else:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO popularity (recipe_id, score) VALUES (?, ?)",
+                    (recipe_id, score))
+            self.db.execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES ('popularity_landmark', ?)",
+                (self.popularity.landmark,))
+    
+    def record_recipe_view(self, recipe_id):
+        self._record_popularity(recipe_id, PopularityCounter.VIEW_WEIGHT)
+    
+    def get_popular_recipes(self, limit):
+        recipe_ids = self.popularity.top(limit)
+        if len(recipe_ids) < limit:
+            popular = set(recipe_ids)
+            recipe_ids.extend(itertools.islice(
+                (recipe_id for (recipe_id,) in self.db.execute(
+                    "SELECT id FROM recipes ORDER BY id LIMIT ?", (2 * limit,))
+                 if recipe_id not in popular),
+                limit - len(recipe_ids)))
+        summaries = self._recipe_summaries(recipe_ids)
+        return [summaries[recipe_id] for recipe_id in recipe_ids if recipe_id in summaries]
+    
+    def _build_search_index(self, db):
+        index = SearchIndex()
+        ingredient_names = {}
+        for recipe_id, name in db.execute(
+                "SELECT recipe_id, name FROM ingredients ORDER BY recipe_id, position"):
+            ingredient_names.setdefault(recipe_id, []).append(name)
+        for recipe_id, title in db.execute("SELECT id, title FROM recipes ORDER BY id"):
+            index.add(recipe_id, title, ingredient_names.get(recipe_id, ()))
+        return index
+    
+    def build_index_in_background(self, name):
+        with self._index_lock:
+            future = self._index_futures.get(name)
+            if getattr(self, name) is not None or (future is not None and not future.done()):
+                return future
+            future = self._index_futures[name] = concurrent.futures.Future()
+            threading.Thread(target=self._build_index, args=(name, future, self._index_version),
+                             name=f"recipe-index{name}", daemon=True).start()
+            return future
+    
+    def _build_index(self, name, future, version):
+        db = sqlite3.connect(self.db_path)
+        try:
+            index = getattr(self, self.BACKGROUND_INDEXES[name])(db)
+        except Exception as error:
+            future.set_exception(error)
+            return
+        finally:
+            db.close()
+        with self._index_lock:
+            if version == self._index_version and getattr(self, name) is None:
+                setattr(self, name, index)
+        future.set_result(None)
+    
+    def _wait_for_index(self, name):
+        # Блокирует: вызывать из фоновых задач, а не из потока интерфейса.
+        # Индекс мог быть выброшен из-за правки во время построения: тогда строим заново
+        while getattr(self, name) is None:
+            future = self.build_index_in_background(name)
+            if future is not None:
+                future.result()
+        return getattr(self, name)
+    
+    def find_recipes_by_ingredients(self, ingredient_names, max_missing=0):
+        index = self._wait_for_index("_ingredient_index")
+        with self._index_lock:
+            return index.missing_at_most(ingredient_names, max_missing)
+    
+    def _build_ingredient_index(self, db):
+        return IngredientIndex.from_rows(db.execute("SELECT recipe_id, name FROM ingredients"))
+    
+    def _build_similarity_index(self, db):
+        index = SimilarityIndex()
+        rows = db.execute("SELECT recipe_id, name FROM ingredients ORDER BY recipe_id")
+        for recipe_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+            index.add(recipe_id, [name for _, name in group])
+        return index
+    
+    def similar_recipe_ids(self, recipe_id, limit=10):
+        # Не трогает self.db, поэтому годится для фоновых задач
+        cached = self._similar_cache.get(recipe_id)
+        # Короткий список полон, если его искали с лимитом не меньше нынешнего
+        if cached is None or cached[0] < limit:
+            index = self._wait_for_index("_similarity_index")
+            with self._index_lock:
+                neighbours = index.similar(recipe_id, limit)
+            if len(neighbours) < limit:
+                # LSH упускает соседей с малым пересечением: добираем точным перебором
+                # рецептов, у которых есть общий ингредиент
+                ingredient_index = self._wait_for_index("_ingredient_index")
+                with self._index_lock:
+                    neighbours = ingredient_index.most_similar(recipe_id, limit)
+            cached = self._similar_cache[recipe_id] = (limit, neighbours)
+        return cached[1][:limit]
+    
+    def similar_recipes(self, recipe_id, limit=10):
+        neighbours = self.similar_recipe_ids(recipe_id, limit)
+        summaries = self._recipe_summaries(neighbour_id for neighbour_id, _ in neighbours)
+        return [(summaries[neighbour_id], score) for neighbour_id, score in neighbours
+                if neighbour_id in summaries]
+    
+    def search_recipe_ids(self, query, limit=None):
+        # Первый поиск ждёт фонового построения индекса: вызывать из фоновых задач
+        return self._wait_for_index("_search_index").search(query, limit)
     
     def get_all_recipes(self):
-        return self.recipes
+        rows = self.db.execute(
+            "SELECT id, title, category, time, image FROM recipes ORDER BY id")
+        return [self._recipe_summary(row) for row in rows]
     
     def get_recipes_by_category(self, category):
-        return [r for r in self.recipes if r.category == category]
+        rows = self.db.execute(
+            "SELECT id, title, category, time, image FROM recipes WHERE category = ? ORDER BY id",
+            (category,))
+        return [self._recipe_summary(row) for row in rows]
+    
+    def iter_recipe_summaries(self, category=None, batch_size=200):
+        last_id = 0
+        while True:
+            if category is None:
+                rows = self.db.execute(
+                    "SELECT id, title, category, time, image FROM recipes "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)).fetchall()
+            else:
+                rows = self.db.execute(
+                    "SELECT id, title, category, time, image FROM recipes "
+                    "WHERE category = ? AND id > ? ORDER BY id LIMIT ?",
+                    (category, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._recipe_summary(row)
+            last_id = rows[-1][0]
+    
+    def _recipe_summaries(self, recipe_ids):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        summaries = {}
+        for start in range(0, len(recipe_ids), 500):
+            chunk = recipe_ids[start:start + 500]
+            for row in self.db.execute(
+                    "SELECT id, title, category, time, image FROM recipes "
+                    f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                summaries[row[0]] = self._recipe_summary(row)
+        return summaries
+    
+    def iter_recipes(self, recipe_ids, batch_size=200):
+        recipe_ids = iter(recipe_ids)
+        while True:
+            batch = list(itertools.islice(recipe_ids, batch_size))
+            if not batch:
+                return
+            summaries = self._recipe_summaries(batch)
+            for recipe_id in batch:
+                if recipe_id in summaries:
+                    yield summaries[recipe_id]
     
     def get_recipe_by_id(self, recipe_id):
-        for recipe in self.recipes:
-            if recipe.id == recipe_id:
-                return recipe
-        return None
+        row = self.db.execute(
+            "SELECT id, title, category, time, image, servings FROM recipes WHERE id = ?",
+            (recipe_id,)).fetchone()
+        if row is None:
+            return None
+        recipe = self._recipe_summary(row[:5])
+        recipe.servings = row[5]
+        recipe.ingredients = [
+            Ingredient(name, amount, unit) for name, amount, unit in self.db.execute(
+                "SELECT name, amount, unit FROM ingredients WHERE recipe_id = ? ORDER BY position",
+                (recipe_id,))]
+        recipe.steps = tuple(
+            text for (text,) in self.db.execute(
+                "SELECT text FROM steps WHERE recipe_id = ? ORDER BY position",
+                (recipe_id,)))
+        return recipe
+    
+    def _allocate_recipe_id(self):
+        recipe_id = self._next_recipe_id
+        self._next_recipe_id += 1
+        return recipe_id
+    
+    def _save_next_recipe_id(self):
+        self.db.execute(
+            "INSERT OR REPLACE INTO counters (name, value) VALUES ('next_recipe_id', ?)",
+            (self._next_recipe_id,))
     
     def add_recipe(self, recipe):
-        recipe.id = max(r.id for r in self.recipes) + 1 if self.recipes else 1
-        self.recipes.append(recipe)
-        return recipe.id
+        return self.add_recipes([recipe])[0]
+    
+    def add_recipes(self, recipes):
+        added = []
+        with self.db:
+            for recipe in recipes:
+                recipe.id = self._allocate_recipe_id()
+                recipe.servings = recipe.servings or DEFAULT_SERVINGS
+                self.db.execute(
+                    "INSERT INTO recipes (id, title, category, time, image, servings) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (recipe.id, recipe.title, recipe.category, recipe.time, recipe.image,
+                     recipe.servings))
+                self._write_recipe_details(recipe)
+                added.append(recipe)
+            self._save_next_recipe_id()
+        with self._index_lock:
+            self._index_version += 1
+            if self._search_index is not None:
+                for recipe in added:
+                    self._search_index.add(
+                        recipe.id, recipe.title, [ing.name for ing in recipe.ingredients])
+            if self._ingredient_index is not None:
+                for recipe in added:
+                    self._ingredient_index.add(
+                        recipe.id, [ing.name for ing in recipe.ingredients])
+            if self._similarity_index is not None:
+                for recipe in added:
+                    self._similarity_index.add(
+                        recipe.id, [ing.name for ing in recipe.ingredients])
+            self._similar_cache.clear()
+        return [recipe.id for recipe in added]
+    
+    def update_recipe(self, recipe):
+        recipe.servings = recipe.servings or DEFAULT_SERVINGS
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE recipes SET title = ?, category = ?, time = ?, image = ?, servings = ? "
+                "WHERE id = ?",
+                (recipe.title, recipe.category, recipe.time, recipe.image, recipe.servings,
+                 recipe.id))
+            if cursor.rowcount == 0:
+                return False
+            self._delete_recipe_details(recipe.id)
+            self._write_recipe_details(recipe)
+        with self._index_lock:
+            self._index_version += 1
+            if self._search_index is not None:
+                self._search_index.add(
+                    recipe.id, recipe.title, [ing.name for ing in recipe.ingredients])
+            if self._ingredient_index is not None:
+                self._ingredient_index.remove(recipe.id)
+                self._ingredient_index.add(recipe.id, [ing.name for ing in recipe.ingredients])
+            if self._similarity_index is not None:
+                self._similarity_index.remove(recipe.id)
+                self._similarity_index.add(recipe.id, [ing.name for ing in recipe.ingredients])
+            self._similar_cache.clear()
+        self.menu.replace_recipe(self._recipe_summary(
+            (recipe.id, recipe.title, recipe.category, recipe.time, recipe.image)))
+        for view in list(self._shopping_views):
+            view.recipe_changed(recipe.id)
+        return True
+    
+    def delete_recipe(self, recipe_id):
+        with self.db:
+            cursor = self.db.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+            if cursor.rowcount == 0:
+                return False
+            self._delete_recipe_details(recipe_id)
+            self.db.execute("DELETE FROM menu WHERE recipe_id = ?", (recipe_id,))
+            self.db.execute("DELETE FROM popularity WHERE recipe_id = ?", (recipe_id,))
+        self.popularity.remove(recipe_id)
+        with self._index_lock:
+            self._index_version += 1
+            if self._search_index is not None:
+                self._search_index.remove(recipe_id)
+            if self._ingredient_index is not None:
+                self._ingredient_index.remove(recipe_id)
+            if self._similarity_index is not None:
+                self._similarity_index.remove(recipe_id)
+            self._similar_cache.clear()
+        self.menu.remove_recipe(recipe_id)
+        return True
     
     def get_menu_for_date(self, date):
-        return self.menu.get(date, {"Завтрак": None, "Обед": None, "Ужин": None})
+        return self.menu.get_day(date)
+    
+    def get_menu_range(self, start_date, end_date):
+        return list(self.menu.slots(start_date, end_date))
     
     def add_to_menu(self, date, meal_type, recipe):
-        if date not in self.menu:
-            self.menu[date] = {"Завтрак": None, "Обед": None, "Ужин": None}
-        self.menu[date][meal_type] = recipe
+        self.set_menu_slots([(date, meal_type, recipe)])
+        if recipe is not None:
+            self._record_popularity(recipe.id, PopularityCounter.COOK_WEIGHT)
+    
+    def set_menu_slots(self, slots):
+        with self.db:
+            for date, meal_type, recipe in slots:
+                date = as_date(date)
+                self.menu.set(date, meal_type, recipe)
+                if recipe is None:
+                    self.db.execute(
+                        "DELETE FROM menu WHERE date = ? AND meal_type = ?",
+                        (date.isoformat(), meal_type))
+                else:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO menu (date, meal_type, recipe_id) VALUES (?, ?, ?)",
+                        (date.isoformat(), meal_type, recipe.id))
+    
+    def _diet_excluded_ids(self, diet):
+        if diet not in DIET_EXCLUDED_INGREDIENTS:
+            return set()
+        # Названий ингредиентов на порядки меньше, чем строк: сверяем словарь, а не таблицу
+        names = [name for (name,) in self.db.execute("SELECT DISTINCT name FROM ingredients")
+                 if excluded_by_diet(name, diet)]
+        excluded = set()
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            excluded.update(recipe_id for (recipe_id,) in self.db.execute(
+                "SELECT recipe_id FROM ingredients "
+                f"WHERE name IN ({', '.join('?' * len(chunk))})", chunk))
+        return excluded
+    
+    def plan_menu(self, start_date, end_date, max_time=None, repeat_window=7,
+                  categories=None, diet=None, seed=None):
+        start_date, end_date = as_date(start_date), as_date(end_date)
+        if categories is None:
+            categories = {meal_type: meal_type for meal_type in MenuStore.MEAL_TYPES}
+        if diet is None:
+            diet = self.user_preferences['diet']
+        excluded = self._diet_excluded_ids(diet)
+        
+        candidates = {}
+        for meal_type, category in categories.items():
+            query = "SELECT id FROM recipes WHERE category = ?"
+            params = [category]
+            if max_time is not None:
+                query += " AND time <= ?"
+                params.append(max_time)
+            candidates[meal_type] = [
+                recipe_id for (recipe_id,) in self.db.execute(query, params)
+                if recipe_id not in excluded]
+        
+        window = datetime.timedelta(days=repeat_window)
+        fixed = [(date, meal_type, recipe.id) for date, meal_type, recipe
+                 in self.menu.slots(start_date - window, end_date + window)]
+        dates = [start_date + datetime.timedelta(days=offset)
+                 for offset in range((end_date - start_date).days + 1)]
+        planner = MenuPlanner(candidates, repeat_window, fixed, seed)
+        planned = planner.plan(dates, list(categories))
+        
+        summaries = self._recipe_summaries(recipe_id for _, _, recipe_id in planned)
+        self.set_menu_slots(
+            (date, meal_type, summaries[recipe_id]) for date, meal_type, recipe_id in planned)
+        return len(planned), planner.unfilled
+    
+    def _menu_slots(self, start_date, end_date):
+        return [(date, meal_type, recipe.id)
+                for date, meal_type, recipe in self.menu.slots(start_date, end_date)]
+    
+    def _ingredient_rows(self, recipe_ids):
+        rows = []
+        for start in range(0, len(recipe_ids), 500):
+            chunk = recipe_ids[start:start + 500]
+            rows.extend(self.db.execute(
+                "SELECT i.recipe_id, i.name, i.amount, i.unit, r.servings "
+                "FROM ingredients i JOIN recipes r ON r.id = i.recipe_id "
+                f"WHERE i.recipe_id IN ({', '.join('?' * len(chunk))}) "
+                "ORDER BY i.recipe_id, i.position", chunk))
+        return rows
+    
+    def scale_recipes(self, recipe_ids, servings):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        rows = self._ingredient_rows(recipe_ids)
+        amounts = scale_amounts(
+            array("d", [amount for _, _, amount, _, _ in rows]),
+            array("d", [servings / base for _, _, _, _, base in rows]))
+        scaled = {recipe_id: [] for recipe_id in recipe_ids}
+        for (recipe_id, name, _, unit, _), amount in zip(rows, amounts):
+            scaled[recipe_id].append(Ingredient(name, amount, unit))
+        return scaled
+    
+    def scale_recipe(self, recipe_id, servings):
+        recipe = self.get_recipe_by_id(recipe_id)
+        if recipe is None:
+            return None
+        factor = servings / recipe.servings
+        amounts = scale_amounts([ing.amount for ing in recipe.ingredients],
+                                itertools.repeat(factor))
+        recipe.ingredients = [Ingredient(ing.name, amount, ing.unit)
+                              for ing, amount in zip(recipe.ingredients, amounts)]
+        recipe.servings = servings
+        return recipe
+    
+    def scale_menu(self, start_date, end_date, servings):
+        slots = self._menu_slots(start_date, end_date)
+        scaled = self.scale_recipes([recipe_id for _, _, recipe_id in slots], servings)
+        return {(date, meal_type): scaled[recipe_id] for date, meal_type, recipe_id in slots}
+    
+    def _recipe_ingredients(self, recipe_ids, servings=None):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, name, amount, unit, base in self._ingredient_rows(list(recipe_ids)):
+            ingredients[recipe_id].append(
+                (name, amount * servings / base if servings else amount, unit))
+        return ingredients
+    
+    def shopping_list_view(self, start_date, end_date, servings=None):
+        view = ShoppingListView(
+            self.menu, self._recipe_ingredients, start_date, end_date, servings)
+        self._shopping_views.add(view)
+        return view
+    
+    def get_shopping_list(self, start_date, end_date, servings=None):
+        recipe_counts = collections.Counter(
+            recipe_id for _, _, recipe_id in self._menu_slots(start_date, end_date))
+        rows = self._ingredient_rows(list(recipe_counts))
+        factors = array("d", [
+            recipe_counts[recipe_id] * (servings / base if servings else 1)
+            for recipe_id, _, _, _, base in rows])
+        amounts = scale_amounts(array("d", [amount for _, _, amount, _, _ in rows]), factors)
+        return build_shopping_list(
+            (name, amount, unit, 1)
+            for (_, name, _, unit, _), amount in zip(rows, amounts))
+    
+    def import_purchases(self, baskets, source, chunk_size=5000):
+        item_ids = dict(self.db.execute("SELECT name, id FROM items"))
+        next_item_id = max(item_ids.values(), default=0) + 1
+        basket_id = (self.db.execute("SELECT MAX(id) FROM baskets").fetchone()[0] or 0) + 1
+        baskets = iter(baskets)
+        imported = 0
+        while True:
+            chunk = list(itertools.islice(baskets, chunk_size))
+            if not chunk:
+                break
+            new_items = []
+            basket_rows = []
+            basket_item_rows = []
+            for date, names in chunk:
+                basket_item_ids = set()
+                for name in names:
+                    item_id = item_ids.get(name)
+                    if item_id is None:
+                        item_id = item_ids[name] = next_item_id
+                        next_item_id += 1
+                        new_items.append((item_id, name))
+                    basket_item_ids.add(item_id)
+                basket_rows.append((basket_id, date, source))
+                basket_item_rows.extend((basket_id, item_id) for item_id in basket_item_ids)
+                basket_id += 1
+            with self.db:
+                self.db.executemany("INSERT INTO items (id, name) VALUES (?, ?)", new_items)
+                self.db.executemany(
+                    "INSERT INTO baskets (id, date, source) VALUES (?, ?, ?)", basket_rows)
+                self.db.executemany(
+                    "INSERT INTO basket_items (basket_id, item_id) VALUES (?, ?)",
+                    basket_item_rows)
+            imported += len(chunk)
+        self._forget_purchase_rules()
+        return imported
+    
+    def delete_purchases(self, source):
+        with self.db:
+            self.db.execute(
+                "DELETE FROM basket_items WHERE basket_id IN "
+                "(SELECT id FROM baskets WHERE source = ?)", (source,))
+            self.db.execute("DELETE FROM baskets WHERE source = ?", (source,))
+        self._forget_purchase_rules()
+    
+    def _forget_purchase_rules(self):
+        with self._index_lock:
+            self._index_version += 1
+            self._purchase_rules = None
+    
+    def import_purchase_file(self, path, chunk_size=5000):
+        source = os.path.basename(path)
+        self.delete_purchases(source)
+        return self.import_purchases(iter_basket_file(path), source, chunk_size)
+    
+    def get_item_names(self, db=None):
+        return dict((db or self.db).execute("SELECT id, name FROM items"))
+    
+    def iter_purchase_baskets(self, source=None, batch_size=5000, db=None):
+        db = db or self.db
+        last_id = 0
+        while True:
+            if source is None:
+                baskets = db.execute(
+                    "SELECT id, date FROM baskets WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)).fetchall()
+            else:
+                baskets = db.execute(
+                    "SELECT id, date FROM baskets WHERE source = ? AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (source, last_id, batch_size)).fetchall()
+            if not baskets:
+                return
+            items = {}
+            for basket_id, item_id in db.execute(
+                    "SELECT basket_id, item_id FROM basket_items "
+                    "WHERE basket_id BETWEEN ? AND ?",
+                    (baskets[0][0], baskets[-1][0])):
+                items.setdefault(basket_id, []).append(item_id)
+            for basket_id, date in baskets:
+                yield basket_id, date, items.get(basket_id, [])
+            last_id = baskets[-1][0]
+    
+    def mine_purchase_rules(self, min_support=0.01, min_confidence=0.3,
+                            max_length=3, source=None, db=None):
+        itemsets, basket_count = mine_frequent_itemsets(
+            lambda: (items for _, _, items in self.iter_purchase_baskets(source, db=db)),
+            min_support, max_length)
+        names = self.get_item_names(db)
+        rules = generate_association_rules(itemsets, basket_count, min_confidence)
+        for rule in rules:
+            rule.antecedent = frozenset(names[item] for item in rule.antecedent)
+            rule.consequent = frozenset(names[item] for item in rule.consequent)
+        return AssociationRules(rules)
+    
+    def _build_purchase_rules(self, db):
+        if db.execute("SELECT 1 FROM baskets LIMIT 1").fetchone() is not None:
+            return self.mine_purchase_rules(
+                self.SUGGESTION_MIN_SUPPORT, self.SUGGESTION_MIN_CONFIDENCE, db=db)
+        # Своей истории покупок нет: учимся на чеках, которые идут вместе с программой
+        if not os.path.exists(PURCHASE_HISTORY_PATH):
+            return AssociationRules([])
+        itemsets, basket_count = mine_frequent_itemsets(
+            lambda: (items for _, items in iter_basket_file(PURCHASE_HISTORY_PATH)),
+            self.SUGGESTION_MIN_SUPPORT, 3)
+        return AssociationRules(generate_association_rules(
+            itemsets, basket_count, self.SUGGESTION_MIN_CONFIDENCE))
+    
+    def suggest_purchases(self, ingredient_names, limit=5):
+        # Блокирует до построения правил: вызывать из фоновых задач
+        on_list = purchase_items(ingredient_names)
+        rules = self._wait_for_index("_purchase_rules")
+        return [PURCHASE_ITEMS[item][0]
+                for item in rules.suggest(on_list, limit, allowed=PURCHASE_ITEMS)]
     
     def update_user_preferences(self, name, diet, notifications):
         self.user_preferences = {
@@ -97,6 +2084,306 @@ class DataRepository:
             'notifications': notifications
         }
 
+APP_STYLESHEET = """
+    QDialog, QMessageBox {
+        background-color: #FFF0F5;
+    }
+    QMessageBox QLabel {
+        color: #8B008B;
+    }
+    QMessageBox QPushButton {
+        background-color: #FF69B4;
+        border: none;
+        padding: 5px 10px;
+        border-radius: 5px;
+        color: white;
+    }
+    QMessageBox QPushButton:hover {
+        background-color: #FF1493;
+    }
+    QGroupBox {
+        border: 1px solid #FFB6C1;
+        border-radius: 5px;
+        margin-top: 10px;
+        padding-top: 15px;
+        color: #C71585;
+        font-weight: bold;
+    }
+    QTextEdit {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+        border-radius: 5px;
+    }
+    QLineEdit {
+        border: 1px solid #FFB6C1;
+        border-radius: 5px;
+        padding: 5px;
+        background: #FFF0F5;
+    }
+    QLineEdit#searchInput {
+        border: 1px solid #FF69B4;
+        border-radius: 10px;
+    }
+    QComboBox {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+        border-radius: 5px;
+        padding: 5px;
+    }
+    QComboBox::drop-down {
+        border: none;
+    }
+    QCheckBox {
+        color: #8B008B;
+    }
+    QCheckBox::indicator {
+        width: 15px;
+        height: 15px;
+    }
+    QCheckBox::indicator:checked {
+        background-color: #FF69B4;
+    }
+    QLabel#logo {
+        color: #FF1493;
+    }
+    QLabel[role="title"] {
+        color: #C71585;
+    }
+    QLabel[role="cardTitle"] {
+        color: #DB7093;
+    }
+    QLabel[role="accent"] {
+        color: #8B008B;
+    }
+    QPushButton#profileButton {
+        background-color: #FF69B4;
+        border-radius: 20px;
+        color: white;
+        font-size: 16px;
+    }
+    QPushButton#profileButton:hover {
+        background-color: #FF1493;
+    }
+    QPushButton[role="primary"] {
+        background-color: #FF69B4;
+        border: none;
+        padding: 8px 15px;
+        border-radius: 5px;
+        color: white;
+    }
+    QPushButton[role="primary"]:hover {
+        background-color: #FF1493;
+    }
+    QPushButton[role="secondary"], QPushButton[role="nav"] {
+        background-color: #FFB6C1;
+        border: none;
+        padding: 8px 15px;
+        border-radius: 5px;
+        color: #8B008B;
+    }
+    QPushButton[role="secondary"]:hover, QPushButton[role="nav"]:hover {
+        background-color: #FF69B4;
+        color: white;
+    }
+    QPushButton[role="nav"][current="true"] {
+        background-color: #DB7093;
+        color: white;
+    }
+    QPushButton[role="accent"] {
+        background-color: #DB7093;
+        border: none;
+        padding: 8px 15px;
+        border-radius: 5px;
+        color: white;
+        font-weight: bold;
+    }
+    QPushButton[role="accent"]:hover {
+        background-color: #FF1493;
+    }
+    QPushButton[compact="true"] {
+        padding: 5px 10px;
+    }
+    QFrame#recipeCard {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+        border-radius: 10px;
+        padding: 10px;
+    }
+    QAbstractScrollArea#cardsGrid {
+        border: none;
+    }
+    #cardsGrid QScrollBar:vertical {
+        background: #FFF0F5;
+        width: 10px;
+    }
+    #cardsGrid QScrollBar::handle:vertical {
+        background: #FF69B4;
+        min-height: 20px;
+        border-radius: 4px;
+    }
+    QListView#recipesList {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+        border-radius: 5px;
+    }
+    QListView#recipesList::item {
+        padding: 8px;
+        border-bottom: 1px solid #FFB6C1;
+    }
+    QListView#recipesList::item:hover {
+        background-color: #FFE4E1;
+    }
+    QCalendarWidget {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+    }
+    QCalendarWidget QToolButton {
+        color: #8B008B;
+        font-size: 12px;
+        icon-size: 20px, 20px;
+    }
+    QCalendarWidget QMenu {
+        background-color: #FFF0F5;
+        border: 1px solid #FFB6C1;
+    }
+    QCalendarWidget QSpinBox {
+        background-color: #FFF0F5;
+        color: #8B008B;
+        selection-background-color: #FF69B4;
+        selection-color: white;
+    }
+    QCalendarWidget QWidget {
+        alternate-background-color: #FFE4E1;
+    }
+    QCalendarWidget QAbstractItemView:enabled {
+        color: #8B008B;
+        selection-background-color: #FF69B4;
+        selection-color: white;
+    }
+"""
+
+def apply_theme(app):
+    app.setStyle("Fusion")
+    
+    palette = app.palette()
+    palette.setColor(palette.Window, QColor(255, 240, 245))  
+    palette.setColor(palette.WindowText, QColor(139, 0, 139))  
+    palette.setColor(palette.Base, QColor(255, 240, 245))  
+    palette.setColor(palette.AlternateBase, QColor(255, 228, 225))  
+    palette.setColor(palette.ToolTipBase, Qt.white)
+    palette.setColor(palette.ToolTipText, Qt.black)
+    palette.setColor(palette.Text, QColor(139, 0, 139)) 
+    palette.setColor(palette.Button, QColor(255, 182, 193))  
+    palette.setColor(palette.ButtonText, QColor(139, 0, 139)) 
+    palette.setColor(palette.BrightText, Qt.red)
+    palette.setColor(palette.Link, QColor(255, 105, 180))  
+    palette.setColor(palette.Highlight, QColor(255, 105, 180))  
+    palette.setColor(palette.HighlightedText, Qt.white)
+    app.setPalette(palette)
+    app.setStyleSheet(APP_STYLESHEET)
+
+class RecipeListModel(QAbstractListModel):
+    BATCH_SIZE = 100
+    
+    def __init__(self, label=None, parent=None):
+        super().__init__(parent)
+        self._label = label or (lambda r: f"{r.title} ({r.time} мин, {r.category})")
+        self._recipes = []
+        self._source = iter(())
+        self._exhausted = True
+    
+    def set_source(self, recipes):
+        self.beginResetModel()
+        self._recipes = []
+        self._source = iter(recipes)
+        self._exhausted = False
+        self.endResetModel()
+    
+    def extend_source(self, recipes):
+        self._source = itertools.chain(self._source, recipes)
+        self._exhausted = False
+    
+    def recipe_at(self, row):
+        return self._recipes[row]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._recipes)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        recipe = self._recipes[index.row()]
+        if role == Qt.DisplayRole:
+            return self._label(recipe)
+        if role == Qt.UserRole:
+            return recipe.id
+        return None
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        batch = list(itertools.islice(self._source, self.BATCH_SIZE))
+        if len(batch) < self.BATCH_SIZE:
+            self._exhausted = True
+        if batch:
+            first = len(self._recipes)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self._recipes.extend(batch)
+            self.endInsertRows()
+
+class SimilarRecipesSignals(QObject):
+    ready = pyqtSignal()
+
+class SimilarRecipesTask(QRunnable):
+    def __init__(self, recipe_id):
+        super().__init__()
+        self.recipe_id = recipe_id
+        self.signals = SimilarRecipesSignals()
+    
+    def run(self):
+        # Индекс похожести строится секунды: считаем соседей вне потока интерфейса
+        DataRepository.instance().similar_recipe_ids(self.recipe_id)
+        self.signals.ready.emit()
+
+class PantrySearchSignals(QObject):
+    results_ready = pyqtSignal(int, list)
+
+class PantrySearchTask(QRunnable):
+    def __init__(self, generation, ingredient_names, max_missing):
+        super().__init__()
+        self.generation = generation
+        self.ingredient_names = ingredient_names
+        self.max_missing = max_missing
+        self.signals = PantrySearchSignals()
+    
+    def run(self):
+        # Первый поиск ждёт построения индекса ингредиентов — не в потоке интерфейса
+        matches = DataRepository.instance().find_recipes_by_ingredients(
+            self.ingredient_names, self.max_missing)
+        self.signals.results_ready.emit(
+            self.generation, [recipe_id for recipe_id, _ in matches])
+
+class PurchaseSuggestionsSignals(QObject):
+    ready = pyqtSignal(str, list)
+
+class PurchaseSuggestionsTask(QRunnable):
+    def __init__(self, message, ingredient_names):
+        super().__init__()
+        self.message = message
+        self.ingredient_names = ingredient_names
+        self.signals = PurchaseSuggestionsSignals()
+    
+    def run(self):
+        # Правила по чекам майнятся при первом списке покупок — не в потоке интерфейса
+        try:
+            suggestions = DataRepository.instance().suggest_purchases(self.ingredient_names)
+        except (OSError, ValueError, sqlite3.Error):
+            suggestions = []
+        self.signals.ready.emit(self.message, suggestions)
+
 class RecipeDetailDialog(QDialog):
     def __init__(self, recipe, parent=None):
         super().__init__(parent)
@@ -108,12 +2395,14 @@ class RecipeDetailDialog(QDialog):
         
         title_label = QLabel(recipe.title)
         title_label.setFont(QFont('Arial', 16, QFont.Bold))
-        title_label.setStyleSheet("color: #C71585;")
+        title_label.setProperty("role", "title")
         layout.addWidget(title_label)
 
         details_layout = QHBoxLayout()
         details_layout.addWidget(QLabel(f"Категория: {recipe.category}"))
         details_layout.addWidget(QLabel(f"Время приготовления: {recipe.time} мин"))
+        if recipe.servings:
+            details_layout.addWidget(QLabel(f"Порций: {recipe.servings}"))
         layout.addLayout(details_layout)
 
         ingredients_group = QGroupBox("Ингредиенты")
@@ -138,30 +2427,46 @@ class RecipeDetailDialog(QDialog):
         
         steps_group.setLayout(steps_layout)
         layout.addWidget(steps_group)
+        
+        self.recipe_id = recipe.id
+        self.similar_group = QGroupBox("Похожие рецепты")
+        similar_layout = QVBoxLayout()
+        self.similar_list = QListWidget()
+        placeholder = QListWidgetItem("Подбираем похожие рецепты…")
+        placeholder.setFlags(Qt.NoItemFlags)
+        self.similar_list.addItem(placeholder)
+        self.similar_list.itemDoubleClicked.connect(
+            lambda item: self.open_recipe(item.data(Qt.UserRole)))
+        similar_layout.addWidget(self.similar_list)
+        self.similar_group.setLayout(similar_layout)
+        layout.addWidget(self.similar_group)
+        
+        task = SimilarRecipesTask(recipe.id)
+        task.signals.ready.connect(self.show_similar_recipes)
+        QThreadPool.globalInstance().start(task)
 
         button_box = QDialogButtonBox(QDialogButtonBox.Close)
         button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
         
         self.setLayout(layout)
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #FFF0F5;
-            }
-            QGroupBox {
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 15px;
-                color: #C71585;
-                font-weight: bold;
-            }
-            QTextEdit {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-            }
-        """)
+    
+    def show_similar_recipes(self):
+        similar = DataRepository.instance().similar_recipes(self.recipe_id)
+        if not similar:
+            self.similar_group.hide()
+            return
+        self.similar_list.clear()
+        for other, score in similar:
+            item = QListWidgetItem(f"{other.title} ({other.time} мин) — {score:.0%}")
+            item.setData(Qt.UserRole, other.id)
+            self.similar_list.addItem(item)
+    
+    def open_recipe(self, recipe_id):
+        window = self.parent()
+        self.accept()
+        if window is not None:
+            QTimer.singleShot(0, lambda: window.show_recipe_detail(recipe_id))
 
 class BaseScreen(QWidget):
     def __init__(self, parent):
@@ -177,34 +2482,17 @@ class BaseScreen(QWidget):
         
         self.logo = QLabel("🍳 Кулинарный справочник")
         self.logo.setFont(QFont('Arial', 14, QFont.Bold))
-        self.logo.setStyleSheet("color: #FF1493;")  
+        self.logo.setObjectName("logo")
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск рецептов...")
         self.search_input.setFixedWidth(300)
-        self.search_input.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #FF69B4;
-                border-radius: 10px;
-                padding: 5px;
-                background: #FFF0F5;
-            }
-        """)
+        self.search_input.setObjectName("searchInput")
         
         self.profile_btn = QPushButton("👤")
         self.profile_btn.setFixedSize(40, 40)
         self.profile_btn.clicked.connect(self.parent.show_profile)
-        self.profile_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #FF69B4;
-                border-radius: 20px;
-                color: white;
-                font-size: 16px;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
+        self.profile_btn.setObjectName("profileButton")
         
         self.header.addWidget(self.logo)
         self.header.addStretch()
@@ -224,19 +2512,7 @@ class BaseScreen(QWidget):
         self.menu_btn.clicked.connect(self.parent.show_menu)
         
         for btn in [self.main_btn, self.recipes_btn, self.menu_btn]:
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #FFB6C1;
-                    border: none;
-                    padding: 8px 15px;
-                    border-radius: 5px;
-                    color: #8B008B;
-                }
-                QPushButton:hover {
-                    background-color: #FF69B4;
-                    color: white;
-                }
-            """)
+            btn.setProperty("role", "nav")
         
         self.nav_layout.addWidget(self.main_btn)
         self.nav_layout.addWidget(self.recipes_btn)
@@ -260,32 +2536,129 @@ class BaseScreen(QWidget):
         }
         
         for name, btn in buttons.items():
-            if name == current_screen:
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #DB7093;
-                        color: white;
-                        border: none;
-                        padding: 8px 15px;
-                        border-radius: 5px;
-                    }
-                """)
-            else:
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #FFB6C1;
-                        border: none;
-                        padding: 8px 15px;
-                        border-radius: 5px;
-                        color: #8B008B;
-                    }
-                    QPushButton:hover {
-                        background-color: #FF69B4;
-                        color: white;
-                    }
-                """)
+            btn.setProperty("current", name == current_screen)
+            btn.style().unpolish(btn)
+            btn.style().polish(btn)
+
+class RecipeCard(QFrame):
+    def __init__(self, on_open, parent=None):
+        super().__init__(parent)
+        self.recipe_id = None
+        self.setFrameShape(QFrame.StyledPanel)
+        self.setLineWidth(1)
+        self.setObjectName("recipeCard")
+        
+        layout = QVBoxLayout()
+        
+        self.title = QLabel()
+        self.title.setFont(QFont('Arial', 12, QFont.Bold))
+        self.title.setProperty("role", "cardTitle")
+        
+        self.details = QLabel()
+        self.details.setProperty("role", "accent")
+        
+        btn = QPushButton("Посмотреть рецепт")
+        btn.clicked.connect(lambda: on_open(self.recipe_id))
+        btn.setProperty("role", "primary")
+        btn.setProperty("compact", True)
+        
+        layout.addWidget(self.title)
+        layout.addWidget(self.details)
+        layout.addWidget(btn)
+        
+        self.setLayout(layout)
+    
+    def bind(self, recipe):
+        if recipe.id == self.recipe_id:
+            return
+        self.recipe_id = recipe.id
+        self.title.setText(recipe.title)
+        self.details.setText(f"⏱ {recipe.time} мин | 🍽 {recipe.category}")
+
+class RecipeCardGrid(QAbstractScrollArea):
+    CARD_HEIGHT = 130
+    CARD_MIN_WIDTH = 260
+    SPACING = 15
+    BATCH_SIZE = 60
+    PREFETCH_ROWS = 3
+    
+    def __init__(self, card_factory, parent=None):
+        super().__init__(parent)
+        self._card_factory = card_factory
+        self._cards = []
+        self._recipes = []
+        self._source = iter(())
+        self._exhausted = True
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(20)
+    
+    def set_source(self, recipes):
+        self._recipes = []
+        self._source = iter(recipes)
+        self._exhausted = False
+        self.verticalScrollBar().setValue(0)
+        self._update_layout()
+    
+    def _columns(self):
+        width = self.viewport().width()
+        return max(1, (width + self.SPACING) // (self.CARD_MIN_WIDTH + self.SPACING))
+    
+    def _row_height(self):
+        return self.CARD_HEIGHT + self.SPACING
+    
+    def _fetch_until(self, count):
+        while len(self._recipes) < count and not self._exhausted:
+            batch = list(itertools.islice(self._source, self.BATCH_SIZE))
+            if len(batch) < self.BATCH_SIZE:
+                self._exhausted = True
+            self._recipes.extend(batch)
+    
+    def _update_layout(self):
+        columns = self._columns()
+        row_height = self._row_height()
+        viewport_height = self.viewport().height()
+        scroll_bar = self.verticalScrollBar()
+        
+        last_visible_row = (scroll_bar.value() + viewport_height) // row_height
+        self._fetch_until((last_visible_row + 1 + self.PREFETCH_ROWS) * columns)
+        
+        rows = -(-len(self._recipes) // columns)
+        scroll_bar.blockSignals(True)
+        scroll_bar.setRange(0, max(0, rows * row_height - viewport_height))
+        scroll_bar.setPageStep(viewport_height)
+        scroll_bar.blockSignals(False)
+        
+        first = scroll_bar.value() // row_height * columns
+        last = min(len(self._recipes), (last_visible_row + 1) * columns)
+        visible = max(0, last - first)
+        while len(self._cards) < visible:
+            card = self._card_factory()
+            card.setParent(self.viewport())
+            self._cards.append(card)
+        
+        card_width = (self.viewport().width() - self.SPACING * (columns - 1)) // columns
+        for slot, card in enumerate(self._cards):
+            index = first + slot
+            if slot >= visible:
+                card.hide()
+                continue
+            row, column = divmod(index, columns)
+            card.bind(self._recipes[index])
+            card.setGeometry(column * (card_width + self.SPACING),
+                             row * row_height - scroll_bar.value(),
+                             card_width, self.CARD_HEIGHT)
+            card.show()
+    
+    def scrollContentsBy(self, dx, dy):
+        self._update_layout()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_layout()
 
 class HomeScreen(BaseScreen):
+    POPULAR_COUNT = 12
+    
     def __init__(self, parent):
         super().__init__(parent)
         self.update_nav_buttons('home')
@@ -300,82 +2673,20 @@ class HomeScreen(BaseScreen):
         title = QLabel("Популярные рецепты")
         title.setFont(QFont('Arial', 16, QFont.Bold))
         title.setAlignment(Qt.AlignCenter)
-        title.setStyleSheet("color: #C71585;")  
+        title.setProperty("role", "title")
         self.content_layout.addWidget(title)
         
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setStyleSheet("""
-            QScrollArea {
-                border: none;
-            }
-            QScrollBar:vertical {
-                background: #FFF0F5;
-                width: 10px;
-            }
-            QScrollBar::handle:vertical {
-                background: #FF69B4;
-                min-height: 20px;
-                border-radius: 4px;
-            }
-        """)
-        
-        recipes_widget = QWidget()
-        recipes_layout = QVBoxLayout()
-        recipes_layout.setSpacing(15)
-        
+        self.cards_grid = RecipeCardGrid(self.create_recipe_card)
+        self.cards_grid.setObjectName("cardsGrid")
+        self.load_popular()
+        self.content_layout.addWidget(self.cards_grid)
+    
+    def load_popular(self):
         repo = DataRepository.instance()
-        for recipe in repo.get_all_recipes():
-            recipe_card = self.create_recipe_card(recipe)
-            recipes_layout.addWidget(recipe_card)
-        
-        recipes_widget.setLayout(recipes_layout)
-        scroll.setWidget(recipes_widget)
-        self.content_layout.addWidget(scroll)
-    
-    def create_recipe_card(self, recipe):
-        card = QFrame()
-        card.setFrameShape(QFrame.StyledPanel)
-        card.setLineWidth(1)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-                border-radius: 10px;
-                padding: 10px;
-            }
-        """)
-        
-        layout = QVBoxLayout()
-        
-        title = QLabel(recipe.title)
-        title.setFont(QFont('Arial', 12, QFont.Bold))
-        title.setStyleSheet("color: #DB7093;")
-        
-        details = QLabel(f"⏱ {recipe.time} мин | 🍽 {recipe.category}")
-        details.setStyleSheet("color: #8B008B;")
-        
-        btn = QPushButton("Посмотреть рецепт")
-        btn.clicked.connect(lambda checked, rid=recipe.id: self.parent.show_recipe_detail(rid))
-        btn.setStyleSheet("""
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 5px 10px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
-        
-        layout.addWidget(title)
-        layout.addWidget(details)
-        layout.addWidget(btn)
-        
-        card.setLayout(layout)
-        return card
+        self.cards_grid.set_source(repo.get_popular_recipes(self.POPULAR_COUNT))
+    
+    def create_recipe_card(self):
+        return RecipeCard(self.parent.show_recipe_detail)
 
 class RecipesScreen(BaseScreen):
     def __init__(self, parent):
@@ -396,77 +2707,71 @@ class RecipesScreen(BaseScreen):
         for category in categories:
             btn = QPushButton(category)
             btn.clicked.connect(lambda _, c=category: self.filter_recipes(c))
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #FFB6C1;
-                    border: none;
-                    padding: 5px 10px;
-                    border-radius: 5px;
-                    color: #8B008B;
-                }
-                QPushButton:hover {
-                    background-color: #FF69B4;
-                    color: white;
-                }
-            """)
+            btn.setProperty("role", "secondary")
+            btn.setProperty("compact", True)
             filter_layout.addWidget(btn)
         
         self.content_layout.addLayout(filter_layout)
         
-        self.recipes_list = QListWidget()
-        self.recipes_list.setStyleSheet("""
-            QListWidget {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-            }
-            QListWidget::item {
-                padding: 8px;
-                border-bottom: 1px solid #FFB6C1;
-            }
-            QListWidget::item:hover {
-                background-color: #FFE4E1;
-            }
-        """)
+        pantry_layout = QHBoxLayout()
+        self.pantry_input = QLineEdit()
+        self.pantry_input.setPlaceholderText("Что есть в холодильнике? Например: яйца, молоко, сыр")
+        self.pantry_input.returnPressed.connect(self.find_by_ingredients)
+        pantry_layout.addWidget(self.pantry_input, stretch=1)
+        
+        self.max_missing_input = QSpinBox()
+        self.max_missing_input.setRange(0, 5)
+        self.max_missing_input.setPrefix("докупить до ")
+        pantry_layout.addWidget(self.max_missing_input)
+        
+        pantry_btn = QPushButton("Что приготовить?")
+        pantry_btn.clicked.connect(self.find_by_ingredients)
+        pantry_btn.setProperty("role", "secondary")
+        pantry_btn.setProperty("compact", True)
+        pantry_layout.addWidget(pantry_btn)
+        self.content_layout.addLayout(pantry_layout)
+        self._pantry_generation = 0
+        
+        self.recipes_model = RecipeListModel(parent=self)
+        self.recipes_list = QListView()
+        self.recipes_list.setUniformItemSizes(True)
+        self.recipes_list.setModel(self.recipes_model)
+        self.recipes_list.setObjectName("recipesList")
         self.load_recipes("Все")
-        self.recipes_list.itemDoubleClicked.connect(
-            lambda item: self.parent.show_recipe_detail(item.data(Qt.UserRole)))
+        self.recipes_list.doubleClicked.connect(
+            lambda index: self.parent.show_recipe_detail(index.data(Qt.UserRole)))
         
         self.content_layout.addWidget(self.recipes_list)
         
         add_btn = QPushButton("➕ Добавить рецепт")
         add_btn.clicked.connect(self.parent.show_add_recipe)
-        add_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #DB7093;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                color: white;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
+        add_btn.setProperty("role", "accent")
         self.content_layout.addWidget(add_btn)
     
     def load_recipes(self, category):
-        self.recipes_list.clear()
+        # Поиск по ингредиентам, запущенный раньше, не должен перекрыть этот список
+        self._pantry_generation += 1
         repo = DataRepository.instance()
-        
-        if category == "Все":
-            recipes = repo.get_all_recipes()
-        else:
-            recipes = repo.get_recipes_by_category(category)
-        
-        for recipe in recipes:
-            item = QListWidgetItem(f"{recipe.title} ({recipe.time} мин, {recipe.category})")
-            item.setData(Qt.UserRole, recipe.id)
-            self.recipes_list.addItem(item)
+        self.recipes_model.set_source(
+            repo.iter_recipe_summaries(None if category == "Все" else category))
     
     def filter_recipes(self, category):
         self.load_recipes(category)
+    
+    def find_by_ingredients(self):
+        names = [name.strip() for name in self.pantry_input.text().split(",") if name.strip()]
+        if not names:
+            self.load_recipes("Все")
+            return
+        self._pantry_generation += 1
+        task = PantrySearchTask(self._pantry_generation, names, self.max_missing_input.value())
+        task.signals.results_ready.connect(self.show_pantry_matches)
+        QThreadPool.globalInstance().start(task)
+    
+    def show_pantry_matches(self, generation, recipe_ids):
+        if generation != self._pantry_generation:
+            return
+        self.recipes_model.set_source(DataRepository.instance().iter_recipes(recipe_ids))
 
 class MenuScreen(BaseScreen):
     def __init__(self, parent):
@@ -483,48 +2788,20 @@ class MenuScreen(BaseScreen):
         self.calendar = QCalendarWidget()
         self.calendar.setGridVisible(True)
         self.calendar.clicked.connect(self.load_day_menu)
-        self.calendar.setStyleSheet("""
-            QCalendarWidget {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-            }
-            QCalendarWidget QToolButton {
-                color: #8B008B;
-                font-size: 12px;
-                icon-size: 20px, 20px;
-            }
-            QCalendarWidget QMenu {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-            }
-            QCalendarWidget QSpinBox {
-                background-color: #FFF0F5;
-                color: #8B008B;
-                selection-background-color: #FF69B4;
-                selection-color: white;
-            }
-            QCalendarWidget QWidget { 
-                alternate-background-color: #FFE4E1;
-            }
-            QCalendarWidget QAbstractItemView:enabled {
-                color: #8B008B;
-                selection-background-color: #FF69B4;
-                selection-color: white;
-            }
-        """)
+        self.calendar.currentPageChanged.connect(self.highlight_planned_days)
         self.content_layout.addWidget(self.calendar)
         
+        self.planned_format = QTextCharFormat()
+        self.planned_format.setBackground(QColor("#FFB6C1"))
+        self.planned_format.setForeground(QColor("#C71585"))
+        self.planned_format.setFontWeight(QFont.Bold)
+        self.highlighted_dates = set()
+        self.shopping_view = None
+        repo = DataRepository.instance()
+        repo.menu.subscribe(self.on_menu_changed)
+        self.highlight_planned_days(self.calendar.yearShown(), self.calendar.monthShown())
+        
         self.day_menu_group = QGroupBox()
-        self.day_menu_group.setStyleSheet("""
-            QGroupBox {
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 15px;
-                color: #C71585;
-                font-weight: bold;
-            }
-        """)
         day_menu_layout = QVBoxLayout()
         
         self.breakfast_label = QLabel("Завтрак: не выбрано")
@@ -532,7 +2809,7 @@ class MenuScreen(BaseScreen):
         self.dinner_label = QLabel("Ужин: не выбрано")
         
         for label in [self.breakfast_label, self.lunch_label, self.dinner_label]:
-            label.setStyleSheet("color: #8B008B;")
+            label.setProperty("role", "accent")
         
         day_menu_layout.addWidget(self.breakfast_label)
         day_menu_layout.addWidget(self.lunch_label)
@@ -540,29 +2817,67 @@ class MenuScreen(BaseScreen):
         
         add_btn = QPushButton("Добавить блюдо в меню")
         add_btn.clicked.connect(self.add_to_menu)
-        add_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
+        add_btn.setProperty("role", "primary")
         day_menu_layout.addWidget(add_btn)
         
+        plan_layout = QHBoxLayout()
+        plan_btn = QPushButton("Составить меню на неделю")
+        plan_btn.clicked.connect(self.plan_week)
+        plan_btn.setProperty("role", "primary")
+        plan_layout.addWidget(plan_btn, stretch=1)
+        
+        self.max_time_input = QSpinBox()
+        self.max_time_input.setRange(0, 600)
+        self.max_time_input.setSingleStep(5)
+        self.max_time_input.setSpecialValueText("любое время")
+        self.max_time_input.setPrefix("до ")
+        self.max_time_input.setSuffix(" мин")
+        plan_layout.addWidget(self.max_time_input)
+        day_menu_layout.addLayout(plan_layout)
+        
+        shopping_layout = QHBoxLayout()
+        shopping_btn = QPushButton("Список покупок на неделю")
+        shopping_btn.clicked.connect(self.show_shopping_list)
+        shopping_btn.setProperty("role", "secondary")
+        shopping_layout.addWidget(shopping_btn, stretch=1)
+        
+        self.servings_input = QSpinBox()
+        self.servings_input.setRange(0, 1000)
+        self.servings_input.setSpecialValueText("порции как в рецептах")
+        self.servings_input.setSuffix(" порц.")
+        shopping_layout.addWidget(self.servings_input)
+        day_menu_layout.addLayout(shopping_layout)
+        
         self.day_menu_group.setLayout(day_menu_layout)
         self.content_layout.addWidget(self.day_menu_group)
         
         self.load_day_menu()
     
+    def highlight_planned_days(self, year, month):
+        for date in self.highlighted_dates:
+            self.calendar.setDateTextFormat(QDate(date), QTextCharFormat())
+        first_day = datetime.date(year, month, 1)
+        last_day = first_day.replace(day=QDate(year, month, 1).daysInMonth())
+        repo = DataRepository.instance()
+        self.highlighted_dates = set(repo.menu.dates(first_day, last_day))
+        for date in self.highlighted_dates:
+            self.calendar.setDateTextFormat(QDate(date), self.planned_format)
+    
+    def on_menu_changed(self, date, meal_type, old_recipe, new_recipe):
+        if (date.year, date.month) != (self.calendar.yearShown(), self.calendar.monthShown()):
+            return
+        if DataRepository.instance().menu.is_planned(date):
+            self.highlighted_dates.add(date)
+            self.calendar.setDateTextFormat(QDate(date), self.planned_format)
+        elif date in self.highlighted_dates:
+            self.highlighted_dates.discard(date)
+            self.calendar.setDateTextFormat(QDate(date), QTextCharFormat())
+        if date == self.calendar.selectedDate().toPyDate():
+            self.load_day_menu()
+    
     def load_day_menu(self):
-        selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         repo = DataRepository.instance()
-        menu = repo.get_menu_for_date(selected_date)
+        menu = repo.get_menu_for_date(self.calendar.selectedDate())
         
         self.day_menu_group.setTitle(f"Меню на {self.calendar.selectedDate().toString('dd.MM.yyyy')}")
 
@@ -576,6 +2891,53 @@ class MenuScreen(BaseScreen):
     def add_to_menu(self):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         self.parent.show_select_recipe(selected_date)
+    
+    def plan_week(self):
+        selected = self.calendar.selectedDate()
+        week_start = selected.addDays(1 - selected.dayOfWeek())
+        week_end = week_start.addDays(6)
+        repo = DataRepository.instance()
+        planned, unfilled = repo.plan_menu(
+            week_start, week_end, self.max_time_input.value() or None)
+        
+        period = f"{week_start.toString('dd.MM')}–{week_end.toString('dd.MM.yyyy')}"
+        if unfilled:
+            slots = ", ".join(f"{date:%d.%m} {meal_type.lower()}" for date, meal_type in unfilled)
+            self.parent.show_info_message(
+                f"На {period} запланировано блюд: {planned}.\n"
+                f"Не хватило подходящих рецептов без повторов для: {slots}")
+        elif planned:
+            self.parent.show_success_message(f"На {period} запланировано блюд: {planned}")
+        else:
+            self.parent.show_info_message(f"На {period} нечего добавить: все приёмы пищи заполнены")
+    
+    def show_shopping_list(self):
+        selected = self.calendar.selectedDate()
+        week_start = selected.addDays(1 - selected.dayOfWeek())
+        week_end = week_start.addDays(6)
+        servings = self.servings_input.value() or None
+        view = self.shopping_view
+        if view is None or (view.start_date, view.servings) != (week_start.toPyDate(), servings):
+            if view is not None:
+                view.close()
+            repo = DataRepository.instance()
+            view = self.shopping_view = repo.shopping_list_view(week_start, week_end, servings)
+        items = view.items()
+        
+        period = f"{week_start.toString('dd.MM')}–{week_end.toString('dd.MM.yyyy')}"
+        if not items:
+            self.parent.show_info_message(f"На {period} блюда не запланированы")
+            return
+        lines = [f"• {item.name}: {format_quantity(item.amount, item.unit)}" for item in items]
+        task = PurchaseSuggestionsTask(f"Список покупок на {period}:\n" + "\n".join(lines),
+                                       [item.name for item in items])
+        task.signals.ready.connect(self.show_shopping_message)
+        QThreadPool.globalInstance().start(task)
+    
+    def show_shopping_message(self, message, suggestions):
+        if suggestions:
+            message += "\n\nЧасто покупают вместе: " + ", ".join(suggestions).lower()
+        self.parent.show_info_message(message)
 
 class ProfileScreen(BaseScreen):
     def __init__(self, parent):
@@ -590,16 +2952,6 @@ class ProfileScreen(BaseScreen):
                 child.widget().deleteLater()
         
         user_group = QGroupBox("Мой профиль")
-        user_group.setStyleSheet("""
-            QGroupBox {
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 15px;
-                color: #C71585;
-                font-weight: bold;
-            }
-        """)
         user_layout = QVBoxLayout()
         
         repo = DataRepository.instance()
@@ -607,37 +2959,18 @@ class ProfileScreen(BaseScreen):
         
         name_layout = QHBoxLayout()
         name_label = QLabel("Имя:")
-        name_label.setStyleSheet("color: #8B008B;")
+        name_label.setProperty("role", "accent")
         self.name_input = QLineEdit(user_prefs['name'])
-        self.name_input.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                padding: 5px;
-                background: #FFF0F5;
-            }
-        """)
         name_layout.addWidget(name_label)
         name_layout.addWidget(self.name_input)
         user_layout.addLayout(name_layout)
         
         diet_layout = QHBoxLayout()
         diet_label = QLabel("Предпочтения:")
-        diet_label.setStyleSheet("color: #8B008B;")
+        diet_label.setProperty("role", "accent")
         self.diet_combo = QComboBox()
         self.diet_combo.addItems(["Нет", "Вегетарианство", "Веганство", "Без глютена"])
         self.diet_combo.setCurrentText(user_prefs['diet'])
-        self.diet_combo.setStyleSheet("""
-            QComboBox {
-                background-color: #FFF0F5;
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QComboBox::drop-down {
-                border: none;
-            }
-        """)
         diet_layout.addWidget(diet_label)
         diet_layout.addWidget(self.diet_combo)
         user_layout.addLayout(diet_layout)
@@ -646,48 +2979,15 @@ class ProfileScreen(BaseScreen):
         self.content_layout.addWidget(user_group)
         
         settings_group = QGroupBox("Настройки")
-        settings_group.setStyleSheet("""
-            QGroupBox {
-                border: 1px solid #FFB6C1;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 15px;
-                color: #C71585;
-                font-weight: bold;
-            }
-        """)
         settings_layout = QVBoxLayout()
         
         self.notifications_check = QCheckBox("Получать уведомления")
         self.notifications_check.setChecked(user_prefs['notifications'])
-        self.notifications_check.setStyleSheet("""
-            QCheckBox {
-                color: #8B008B;
-            }
-            QCheckBox::indicator {
-                width: 15px;
-                height: 15px;
-            }
-            QCheckBox::indicator:checked {
-                background-color: #FF69B4;
-            }
-        """)
         settings_layout.addWidget(self.notifications_check)
         
         save_btn = QPushButton("Сохранить")
         save_btn.clicked.connect(self.save_profile)
-        save_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
+        save_btn.setProperty("role", "primary")
         settings_layout.addWidget(save_btn)
         
         settings_group.setLayout(settings_layout)
@@ -695,19 +2995,7 @@ class ProfileScreen(BaseScreen):
         
         logout_btn = QPushButton("Выйти из аккаунта")
         logout_btn.clicked.connect(self.logout)
-        logout_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #FFB6C1;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                color: #8B008B;
-            }
-            QPushButton:hover {
-                background-color: #FF69B4;
-                color: white;
-            }
-        """)
+        logout_btn.setProperty("role", "secondary")
         self.content_layout.addWidget(logout_btn)
     
     def save_profile(self):
@@ -732,47 +3020,96 @@ class ProfileScreen(BaseScreen):
             self.parent.show_home()
             self.parent.show_info_message("Вы успешно вышли из аккаунта")
 
+class StartupProfiler:
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.timings = []
+    
+    def add(self, label, seconds):
+        self.timings.append((label, seconds))
+    
+    @contextlib.contextmanager
+    def measure(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(label, time.perf_counter() - start)
+    
+    def report(self, stream=sys.stdout):
+        for label, seconds in self.timings:
+            print(f"{label}: {seconds * 1000:.1f} ms", file=stream)
+        stream.flush()
+
+class FirstPaintWatcher(QObject):
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.callback is not None:
+            callback, self.callback = self.callback, None
+            QTimer.singleShot(0, callback)
+        return False
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
+        self.profiler = profiler
         self.setWindowTitle("Кулинарный справочник")
         self.setGeometry(100, 100, 800, 600)
         
         self.stack = QStackedWidget()
         
-        self.home_screen = HomeScreen(self)
-        self.recipes_screen = RecipesScreen(self)
-        self.menu_screen = MenuScreen(self)
-        self.profile_screen = ProfileScreen(self)
-        
-        self.stack.addWidget(self.home_screen)
-        self.stack.addWidget(self.recipes_screen)
-        self.stack.addWidget(self.menu_screen)
-        self.stack.addWidget(self.profile_screen)
+        self.screens = {}
+        self.screen_classes = {
+            'home': HomeScreen,
+            'recipes': RecipesScreen,
+            'menu': MenuScreen,
+            'profile': ProfileScreen
+        }
         
         self.setCentralWidget(self.stack)
         self.show_home()
     
+    def get_screen(self, name):
+        screen = self.screens.get(name)
+        if screen is None:
+            if self.profiler is None:
+                screen = self.screen_classes[name](self)
+            else:
+                with self.profiler.measure(f"screen {name}"):
+                    screen = self.screen_classes[name](self)
+            self.screens[name] = screen
+            self.stack.addWidget(screen)
+        return screen
+    
     def show_home(self):
-        self.stack.setCurrentWidget(self.home_screen)
-        self.home_screen.update_nav_buttons('home')
+        if 'home' in self.screens:
+            self.screens['home'].load_popular()
+        screen = self.get_screen('home')
+        self.stack.setCurrentWidget(screen)
+        screen.update_nav_buttons('home')
     
     def show_recipes(self):
-        self.stack.setCurrentWidget(self.recipes_screen)
-        self.recipes_screen.update_nav_buttons('recipes')
+        screen = self.get_screen('recipes')
+        self.stack.setCurrentWidget(screen)
+        screen.update_nav_buttons('recipes')
     
     def show_menu(self):
-        self.stack.setCurrentWidget(self.menu_screen)
-        self.menu_screen.update_nav_buttons('menu')
+        screen = self.get_screen('menu')
+        self.stack.setCurrentWidget(screen)
+        screen.update_nav_buttons('menu')
     
     def show_profile(self):
-        self.stack.setCurrentWidget(self.profile_screen)
+        self.stack.setCurrentWidget(self.get_screen('profile'))
     
     def show_recipe_detail(self, recipe_id):
         repo = DataRepository.instance()
         recipe = repo.get_recipe_by_id(recipe_id)
         
         if recipe:
+            repo.record_recipe_view(recipe_id)
             dialog = RecipeDetailDialog(recipe, self)
             dialog.exec_()
         else:
@@ -789,24 +3126,6 @@ class MainWindow(QMainWindow):
         msg.setIcon(QMessageBox.Critical)
         msg.setText(message)
         msg.setWindowTitle("Ошибка")
-        msg.setStyleSheet("""
-            QMessageBox {
-                background-color: #FFF0F5;
-            }
-            QMessageBox QLabel {
-                color: #8B008B;
-            }
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 5px 10px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
         msg.exec_()
     
     def show_success_message(self, message):
@@ -814,24 +3133,6 @@ class MainWindow(QMainWindow):
         msg.setIcon(QMessageBox.Information)
         msg.setText(message)
         msg.setWindowTitle("Успешно")
-        msg.setStyleSheet("""
-            QMessageBox {
-                background-color: #FFF0F5;
-            }
-            QMessageBox QLabel {
-                color: #8B008B;
-            }
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 5px 10px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
         msg.exec_()
     
     def show_info_message(self, message):
@@ -839,75 +3140,42 @@ class MainWindow(QMainWindow):
         msg.setIcon(QMessageBox.Information)
         msg.setText(message)
         msg.setWindowTitle("Информация")
-        msg.setStyleSheet("""
-            QMessageBox {
-                background-color: #FFF0F5;
-            }
-            QMessageBox QLabel {
-                color: #8B008B;
-            }
-            QPushButton {
-                background-color: #FF69B4;
-                border: none;
-                padding: 5px 10px;
-                border-radius: 5px;
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #FF1493;
-            }
-        """)
         msg.exec_()
     
     def show_confirm_dialog(self, title, message):
         reply = QMessageBox.question(
             self, title, message,
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        
-        msg_box = self.findChild(QMessageBox)
-        if msg_box:
-            msg_box.setStyleSheet("""
-                QMessageBox {
-                    background-color: #FFF0F5;
-                }
-                QMessageBox QLabel {
-                    color: #8B008B;
-                }
-                QPushButton {
-                    background-color: #FF69B4;
-                    border: none;
-                    padding: 5px 10px;
-                    border-radius: 5px;
-                    color: white;
-                }
-                QPushButton:hover {
-                    background-color: #FF1493;
-                }
-            """)
-        
         return reply == QMessageBox.Yes
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+def main(argv):
+    profile_startup = "--profile-startup" in argv
+    argv = [arg for arg in argv if arg != "--profile-startup"]
+    profiler = StartupProfiler(_STARTED_AT)
+    profiler.add("imports", _IMPORTED_AT - _STARTED_AT)
     
-    app.setStyle("Fusion")
+    with profiler.measure("application"):
+        app = QApplication(argv)
+        apply_theme(app)
     
-    palette = app.palette()
-    palette.setColor(palette.Window, QColor(255, 240, 245))  
-    palette.setColor(palette.WindowText, QColor(139, 0, 139))  
-    palette.setColor(palette.Base, QColor(255, 240, 245))  
-    palette.setColor(palette.AlternateBase, QColor(255, 228, 225))  
-    palette.setColor(palette.ToolTipBase, Qt.white)
-    palette.setColor(palette.ToolTipText, Qt.black)
-    palette.setColor(palette.Text, QColor(139, 0, 139)) 
-    palette.setColor(palette.Button, QColor(255, 182, 193))  
-    palette.setColor(palette.ButtonText, QColor(139, 0, 139)) 
-    palette.setColor(palette.BrightText, Qt.red)
-    palette.setColor(palette.Link, QColor(255, 105, 180))  
-    palette.setColor(palette.Highlight, QColor(255, 105, 180))  
-    palette.setColor(palette.HighlightedText, Qt.white)
-    app.setPalette(palette)
+    with profiler.measure("repository"):
+        DataRepository.instance()
+    
+    with profiler.measure("main window"):
+        window = MainWindow(profiler if profile_startup else None)
+    
+    if profile_startup:
+        def first_paint():
+            app.removeEventFilter(watcher)
+            profiler.add("first paint", time.perf_counter() - profiler.started_at)
+            profiler.report()
+            app.quit()
+        
+        watcher = FirstPaintWatcher(first_paint)
+        app.installEventFilter(watcher)
     
-    window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
\ No newline at end of file